@@ -410,7 +410,7 @@ private function applySignature($filePath, $certificate, $signatureBoxes, $signa
             $outputPath = $tempDir . '\\signed.pdf';
             
             // Prepare the POST request to Flask API
-            $response = Http::attach(
+            $signerRequest = Http::attach(
                 'document', file_get_contents($tempPdfPath), 'document.pdf'
             )->attach(
                 'certificate', file_get_contents($certPath), 'certificate.pem'
@@ -420,7 +420,17 @@ private function applySignature($filePath, $certificate, $signatureBoxes, $signa
                 'signature_box', file_get_contents($boxesJsonPath), 'boxes.json'
             )->attach(
                 'private_key', file_get_contents($keyPath), 'private_key.pem'
-            )->post('http://127.0.0.1:5001/sign');
+            );
+
+            $signerUrl = rtrim(config('services.signer.url'), '/');
+            if (config('services.signer.async')) {
+                $response = $this->runSigningJob($signerRequest, $signerUrl);
+                if (!$response) {
+                    return null;
+                }
+            } else {
+                $response = $signerRequest->post($signerUrl . '/sign');
+            }
 
             // Check if the response is OK
             if (!$response->ok()) {
@@ -441,4 +451,59 @@ private function applySignature($filePath, $certificate, $signatureBoxes, $signa
             return null;
         }
     }
-}
\ No newline at end of file
+
+    /**
+     * Submit a signing job to the Flask signer and wait for its result
+     *
+     * The signer answers the submission immediately and processes the job on
+     * its own bounded worker pool; this polls with long-poll requests so the
+     * Flask threads are not held for the whole signing duration. A 503 from
+     * the signer means its queue is full.
+     *
+     * @param \Illuminate\Http\Client\PendingRequest $signerRequest - Request with the signing files attached
+     * @param string $signerUrl - Base URL of the signer API
+     * @return \Illuminate\Http\Client\Response|null - Response holding the signed PDF or null on failure
+     */
+    private function runSigningJob($signerRequest, $signerUrl)
+    {
+        $submitted = $signerRequest->post($signerUrl . '/jobs');
+
+        if ($submitted->status() == 503) {
+            Log::warning('Flask signer queue is full: ' . $submitted->body());
+            return null;
+        }
+
+        if (!$submitted->successful()) {
+            Log::error('Flask signer job submission error: ' . $submitted->body());
+            return null;
+        }
+
+        $jobId = $submitted->json('job_id');
+        $deadline = microtime(true) + config('services.signer.job_timeout');
+        $wait = config('services.signer.poll_wait');
+
+        while (microtime(true) < $deadline) {
+            $status = Http::timeout($wait + 5)->get($signerUrl . '/jobs/' . $jobId, [
+                'wait' => $wait
+            ]);
+
+            if (!$status->ok()) {
+                Log::error('Flask signer job status error: ' . $status->body());
+                return null;
+            }
+
+            $jobStatus = $status->json('status');
+            if ($jobStatus == 'failed') {
+                Log::error('Flask signer job failed: ' . $status->json('error'));
+                return null;
+            }
+
+            if ($jobStatus == 'done') {
+                return Http::get($signerUrl . '/jobs/' . $jobId . '/result');
+            }
+        }
+
+        Log::error('Flask signer job timed out: ' . $jobId);
+        return null;
+    }
+}
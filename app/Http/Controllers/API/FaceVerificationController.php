@@ -5,11 +5,12 @@
 use App\Http\Controllers\Controller;
 use App\Models\VerificationSession;
 use Illuminate\Http\Request;
-use Illuminate\Support\Facades\Storage;
+use Illuminate\Http\UploadedFile;
 use Illuminate\Support\Facades\Log;
 use Illuminate\Support\Str;
 use Illuminate\Support\Facades\Auth;
-use Illuminate\Support\Facades\File;
+use Illuminate\Support\Facades\Crypt;
+use Illuminate\Support\Facades\Http;
 use App\Services\VerificationExperimentLogger;
 
 class FaceVerificationController extends Controller
@@ -32,7 +33,9 @@ public function showFaceVerification()
         if (!session()->has('registration_step') || session('registration_step') != 5) {
             return redirect()->route('register.check');
         }
-        return view('auth.face-verification'); 
+        return view('auth.face-verification', [
+            'ktpFaceToken' => session('registration_data.ktp_face_token')
+        ]); 
     }
 
     public function startSession(Request $request)
@@ -44,7 +47,9 @@ public function startSession(Request $request)
         $session = VerificationSession::create([
             'session_id' => $sessionId,
             'user_id' => Auth::id(), // If authenticated
-            'expires_at' => now()->addHours(1) // Sessions expire after 1 hour
+            'expires_at' => now()->addHours(1), // Sessions expire after 1 hour
+            // Encrypted KTP portrait id from registration, used to match the selfie against it
+            'metadata' => ['ktp_face_token' => $request->input('ktp_face_token')]
         ]);
         
         return response()->json([
@@ -80,7 +85,7 @@ public function detectFace(Request $request)
                 
             if (!$session) {
                 // Cleanup on invalid session
-                $this->cleanupSessionFiles($sessionId);
+                $this->cleanupSession($sessionId);
                 
                 $this->logBiometricAttempt($request, false, 'invalid_session', $startedAt, ['phase' => 'detect_face']);
 
@@ -91,55 +96,19 @@ public function detectFace(Request $request)
                 ], 400);
             }
             
-            // Create directory structure for this session's files
-            $sessionDir = 'face_verification' . DIRECTORY_SEPARATOR . $sessionId;
-            $storageBasePath = storage_path('app');
-            $sessionPath = $storageBasePath . DIRECTORY_SEPARATOR . $sessionDir;
-            
-            // Create directory if it doesn't exist
-            if (!file_exists($sessionPath)) {
-                mkdir($sessionPath, 0755, true);
-            }
-            
+            // The upload is sent as-is; only the service's debug output is written to disk
             $image = $request->file('image');
-            $fileName = $sessionId . '_initial.' . $image->getClientOriginalExtension();
-            $fullImagePath = $sessionPath . DIRECTORY_SEPARATOR . $fileName;
             
-            // Store the image using direct file operations rather than Laravel's storage
-            if (!$image->move($sessionPath, $fileName)) {
-                // Cleanup on image save failure
-                $this->cleanupSessionFiles($sessionId);
-                
-                Log::error('Image failed to save: ' . $fullImagePath);
-                $this->logBiometricAttempt($request, false, 'image_not_saved', $startedAt, ['phase' => 'detect_face']);
+            // Process with the face verification service, which keeps the frame in its session store
+            $response = $this->callFaceService('/detect-face', $image, $sessionId, 'output_initial.jpg');
 
-                return response()->json([
-                    'success' => false,
-                    'message' => 'Image upload failed',
-                    'error_code' => 'IMAGE_NOT_SAVED'
-                ], 500);
-            }
-            
-            // Define output path
-            $outputFileName = 'output_initial.jpg';
-            $outputPath = $sessionPath . DIRECTORY_SEPARATOR . $outputFileName;
-            
-            // Process with OpenCV using Python script
-            $pythonScript = app_path('python' . DIRECTORY_SEPARATOR . 'faceverification' . DIRECTORY_SEPARATOR . 'face_detection.py');
-            
-            // Ensure we use proper directory separators
-            $command = "python \"{$pythonScript}\" \"{$fullImagePath}\" \"{$outputPath}\" 2>&1";
-            exec($command, $output, $returnCode);
-            
-            Log::info('Face detection command executed:', ['command' => $command]); 
-            Log::info('Face detection script output:', ['output' => $output]); 
-            Log::info('Face detection script return code:', ['return_code' => $returnCode]); 
+            Log::info('Face detection service response:', ['status' => $response->status(), 'body' => $response->json()]);
 
-            if ($returnCode !== 0) {
-                // Cleanup on face detection script failure
-                $this->cleanupSessionFiles($sessionId);
+            if ($response->serverError() || $response->json() === null) {
+                // Cleanup on face detection service failure
+                $this->cleanupSession($sessionId);
                 
-                Log::error('Face detection error:', ['error' => implode("\n", $output)]);
+                Log::error('Face detection error:', ['error' => $response->body()]);
                 return response()->json([
                     'success' => false,
                     'message' => 'Face detection processing failed',
@@ -147,25 +116,15 @@ public function detectFace(Request $request)
                 ], 500);
             }
             
-            // Read the face data JSON
-            $faceDataPath = $outputPath . '.json';
-            if (!file_exists($faceDataPath)) {
-                // Cleanup on missing face data
-                $this->cleanupSessionFiles($sessionId);
-                
-                return response()->json([
-                    'success' => false,
-                    'message' => 'Face data processing failed',
-                    'error_code' => 'FACE_DATA_MISSING'
-                ], 500);
-            }
-            
-            $faceData = json_decode(file_get_contents($faceDataPath), true);
+            // Face coordinates are only included outside the verdict output mode
+            $faceData = $response->json();
+            $faceCount = $faceData['face_count'] ?? 0;
+            unset($faceData['success'], $faceData['face_count']);
             
             // Check if face was detected
-            if (empty($faceData['faces'])) {
+            if ($faceCount == 0) {
                 // Cleanup when no face is detected
-                $this->cleanupSessionFiles($sessionId);
+                $this->cleanupSession($sessionId);
                 
                 return response()->json([
                     'success' => false,
@@ -174,12 +133,25 @@ public function detectFace(Request $request)
                 ], 400);
             }
             
+            // Compare the selfie with the photo on the KTP read during registration
+            $faceMatch = $this->matchKtpFace($image, $session->metadata['ktp_face_token'] ?? null);
+            if (config('services.ocr.face_match_required') && !($faceMatch['success'] ?? false)) {
+                $this->cleanupSession($sessionId);
+                
+                return response()->json([
+                    'success' => false,
+                    'message' => 'Your face does not match the photo on your ID card.',
+                    'error_code' => 'FACE_MISMATCH'
+                ], 400);
+            }
+            
             // Update session in database with face data
             $session->update([
                 'initial_face_detected' => true,
                 'metadata' => array_merge($session->metadata ?? [], [
-                    'face_data' => $faceData,
-                    'face_count' => count($faceData['faces'])
+                    'face_data' => $faceData ?: null,
+                    'face_count' => $faceCount,
+                    'ktp_face_match' => $faceMatch
                 ])
             ]);
             
@@ -187,12 +159,12 @@ public function detectFace(Request $request)
                 'success' => true,
                 'message' => 'Face detected successfully',
                 'next_challenge' => 'blink',
-                'face_count' => count($faceData['faces'])
+                'face_count' => $faceCount
             ]);
         } catch (\Exception $e) {
             // Catch-all error handling with cleanup
             Log::error('Unexpected error in detectFace: ' . $e->getMessage());
-            $this->cleanupSessionFiles($request->input('session_id'));
+            $this->cleanupSession($request->input('session_id'));
             
             return response()->json([
                 'success' => false,
@@ -214,7 +186,11 @@ public function verifyLiveness(Request $request)
 
         try {
             $request->validate([
-                'image' => 'required|image|max:5120', // 5MB max
+                'image' => 'required_without_all:frames,video|image|max:5120', // 5MB max
+                'frames' => 'array|max:60', // Burst of frames, tracked across time
+                'frames.*' => 'image|max:5120',
+                'interval_ms' => 'numeric|min:1',
+                'video' => 'file|mimetypes:video/mp4,video/webm,video/quicktime|max:20480', // Short clip, 20MB max
                 'session_id' => 'required|string',
                 'challenge_type' => 'required|string|in:blink,turn_head,smile'
             ]);
@@ -229,7 +205,7 @@ public function verifyLiveness(Request $request)
                 
             if (!$session) {
                 // Cleanup on invalid session
-                $this->cleanupSessionFiles($sessionId);
+                $this->cleanupSession($sessionId);
                 
                 $this->logBiometricAttempt($request, false, 'invalid_session', $startedAt, ['phase' => 'verify_liveness']);
 
@@ -243,7 +219,7 @@ public function verifyLiveness(Request $request)
             // Check if initial face detection was completed
             if (!$session->initial_face_detected) {
                 // Cleanup on sequence error
-                $this->cleanupSessionFiles($sessionId);
+                $this->cleanupSession($sessionId);
                 
                 $this->logBiometricAttempt($request, false, 'initial_face_missing', $startedAt, ['phase' => 'verify_liveness']);
 
@@ -257,7 +233,7 @@ public function verifyLiveness(Request $request)
             // Check prerequisite challenges
             if ($challengeType === 'turn_head' && !$session->challenge_blink_completed) {
                 // Cleanup on sequence error
-                $this->cleanupSessionFiles($sessionId);
+                $this->cleanupSession($sessionId);
                 
                 $this->logBiometricAttempt($request, false, 'blink_prerequisite_missing', $startedAt, ['phase' => 'verify_liveness']);
 
@@ -268,7 +244,7 @@ public function verifyLiveness(Request $request)
                 ], 400);
             } else if ($challengeType === 'smile' && !$session->challenge_turn_head_completed) {
                 // Cleanup on sequence error
-                $this->cleanupSessionFiles($sessionId);
+                $this->cleanupSession($sessionId);
                 
                 $this->logBiometricAttempt($request, false, 'turn_head_prerequisite_missing', $startedAt, ['phase' => 'verify_liveness']);
 
@@ -279,57 +255,23 @@ public function verifyLiveness(Request $request)
                 ], 400);
             }
             
-            // Create directory structure for this session's files
-            $sessionDir = 'face_verification' . DIRECTORY_SEPARATOR . $sessionId;
-            $challengesDir = $sessionDir . DIRECTORY_SEPARATOR . 'challenges';
-            $storageBasePath = storage_path('app');
-            $sessionPath = $storageBasePath . DIRECTORY_SEPARATOR . $sessionDir;
-            $challengesPath = $storageBasePath . DIRECTORY_SEPARATOR . $challengesDir;
-            
-            // Create directory if it doesn't exist
-            if (!file_exists($challengesPath)) {
-                mkdir($challengesPath, 0755, true);
-            }
-            
-            $image = $request->file('image');
-            $fileName = $sessionId . '_' . $challengeType . '.' . $image->getClientOriginalExtension();
-            $fullImagePath = $challengesPath . DIRECTORY_SEPARATOR . $fileName;
+            if ($request->hasFile('frames') || $request->hasFile('video')) {
+                // Bursts and clips go straight to the service, which stops at the first frame showing the gesture
+                $response = $this->callFaceStream('/liveness/' . $challengeType . '/stream', $request);
+            } else {
+                $image = $request->file('image');
             
-            // Store the image using direct file operations
-            if (!$image->move($challengesPath, $fileName)) {
-                // Cleanup on image save failure
-                $this->cleanupSessionFiles($sessionId);
-                
-                Log::error('Challenge image failed to save: ' . $fullImagePath);
-                $this->logBiometricAttempt($request, false, 'image_not_saved', $startedAt, ['phase' => 'verify_liveness']);
-
-                return response()->json([
-                    'success' => false,
-                    'message' => 'Image upload failed',
-                    'error_code' => 'IMAGE_NOT_SAVED'
-                ], 500);
+                // Process with the face verification service
+                $response = $this->callFaceService('/liveness/' . $challengeType, $image, $sessionId, 'output_' . $challengeType . '.jpg');
             }
             
-            // Define output path
-            $outputFileName = 'output_' . $challengeType . '.jpg';
-            $outputPath = $challengesPath . DIRECTORY_SEPARATOR . $outputFileName;
-            
-            // Process with OpenCV using Python script
-            $pythonScript = app_path('python' . DIRECTORY_SEPARATOR . 'faceverification' . DIRECTORY_SEPARATOR . 'liveness_' . $challengeType . '.py');
+            Log::info('Liveness verification service response:', ['status' => $response->status(), 'body' => $response->json()]);
             
-            // Ensure we use proper directory separators
-            $command = "python \"{$pythonScript}\" \"{$fullImagePath}\" \"{$outputPath}\" 2>&1";
-            exec($command, $output, $returnCode);
-            
-            Log::info('Liveness verification command executed:', ['command' => $command]); 
-            Log::info('Liveness verification script output:', ['output' => $output]); 
-            Log::info('Liveness verification script return code:', ['return_code' => $returnCode]);
-            
-            if ($returnCode !== 0) {
+            if (!$response->ok() || !$response->json('success')) {
                 // Cleanup on liveness verification failure
-                $this->cleanupSessionFiles($sessionId);
+                $this->cleanupSession($sessionId);
                 
-                Log::error('Liveness verification error:', ['error' => implode("\n", $output)]);
+                Log::error('Liveness verification error:', ['error' => $response->body()]);
                 $this->logBiometricAttempt($request, false, 'liveness_check_failed', $startedAt, ['challenge_type' => $challengeType, 'phase' => 'verify_liveness']);
 
                 return response()->json([
@@ -379,7 +321,7 @@ public function verifyLiveness(Request $request)
         } catch (\Exception $e) {
             // Catch-all error handling with cleanup
             Log::error('Unexpected error in verifyLiveness: ' . $e->getMessage());
-            $this->cleanupSessionFiles($request->input('session_id'));
+            $this->cleanupSession($request->input('session_id'));
             
             $this->logBiometricAttempt($request, false, 'unexpected_error', $startedAt, ['phase' => 'verify_liveness']);
 
@@ -444,6 +386,9 @@ public function completeVerification(Request $request)
             'expires_at' => now()->addDay() // Verification valid for 24 hours
         ]);
         
+        // The verdict is persisted, so the service can release the session's frames
+        $this->dropFaceSession($sessionId);
+        
         $this->logBiometricAttempt($request, true, null, $startedAt, ['phase' => 'complete_verification']);
 
         return response()->json([
@@ -491,13 +436,125 @@ public function verifyToken(Request $request)
     }
 
     /**
-     * Clean up all files associated with a verification session
+     * Send an uploaded image to the Flask face verification service
+     *
+     * The service keeps the face landmarker and detector loaded between
+     * requests, and keeps each session's decoded frames, landmarks and
+     * results in memory, so nothing is written to disk outside debug mode.
+     *
+     * @param string $endpoint - Service path, e.g. /detect-face or /liveness/blink
+     * @param UploadedFile $image - Image to check
+     * @param string $sessionId - Verification session the result belongs to
+     * @param string $outputName - File name of the annotated image the service keeps
+     *                             under its FACE_DEBUG_DIR in debug output mode
+     * @return \Illuminate\Http\Client\Response
+     */
+    private function callFaceService(string $endpoint, UploadedFile $image, string $sessionId, string $outputName)
+    {
+        $faceUrl = rtrim(config('services.face.url'), '/');
+
+        return Http::timeout(config('services.face.timeout'))
+            ->attach('image', file_get_contents($image->getRealPath()), $image->getClientOriginalName())
+            ->post($faceUrl . $endpoint, [
+                'session_id' => $sessionId,
+                'output_name' => $outputName,
+                'output_mode' => config('services.face.output_mode')
+            ]);
+    }
+
+    /**
+     * Tell the face verification service to release a session's frames and debug images
+     *
+     * @param string $sessionId
+     * @return bool
+     */
+    private function dropFaceSession(string $sessionId)
+    {
+        try {
+            $faceUrl = rtrim(config('services.face.url'), '/');
+            return Http::timeout(config('services.face.timeout'))
+                ->delete($faceUrl . '/sessions/' . urlencode($sessionId))
+                ->ok();
+        } catch (\Exception $e) {
+            Log::error('Face session cleanup error: ' . $e->getMessage());
+            return false;
+        }
+    }
+
+    /**
+     * Match a selfie against the KTP photo kept by the OCR service
+     *
+     * The OCR service embedded the KTP portrait when it read the card and
+     * returned an id for it, so only the selfie and that id are sent here.
+     *
+     * @param UploadedFile $image - Enrollment selfie
+     * @param string|null $ktpFaceToken - Encrypted KTP portrait id stored at registration
+     * @return array|null - success, similarity and threshold, or null when matching is unavailable
+     */
+    private function matchKtpFace(UploadedFile $image, ?string $ktpFaceToken)
+    {
+        if (!$ktpFaceToken) {
+            return null;
+        }
+
+        try {
+            $ktpFaceId = Crypt::decryptString($ktpFaceToken);
+            $ocrUrl = rtrim(config('services.ocr.url'), '/');
+            $response = Http::timeout(config('services.face.timeout'))
+                ->attach('image', file_get_contents($image->getRealPath()), $image->getClientOriginalName())
+                ->post($ocrUrl . '/match-face', [
+                    'ktp_face_id' => $ktpFaceId
+                ]);
+
+            Log::info('KTP face match response:', ['status' => $response->status(), 'body' => $response->json()]);
+            return $response->json();
+        } catch (\Exception $e) {
+            Log::error('KTP face match error: ' . $e->getMessage());
+            return null;
+        }
+    }
+
+    /**
+     * Send a burst of frames or a video clip to the face verification service
+     *
+     * The service tracks the face across frames and reports the challenge as
+     * passed as soon as the gesture happens, so the client does not have to
+     * capture the exact frame.
+     *
+     * @param string $endpoint - Service stream path, e.g. /liveness/blink/stream
+     * @param Request $request - Request holding frames[] (and interval_ms) or video
+     * @return \Illuminate\Http\Client\Response
+     */
+    private function callFaceStream(string $endpoint, Request $request)
+    {
+        $faceUrl = rtrim(config('services.face.url'), '/');
+        $pending = Http::timeout(config('services.face.timeout'));
+
+        if ($request->hasFile('video')) {
+            $video = $request->file('video');
+            $pending = $pending->attach('video', file_get_contents($video->getRealPath()), $video->getClientOriginalName());
+        } else {
+            foreach ($request->file('frames') as $frame) {
+                $pending = $pending->attach('frames', file_get_contents($frame->getRealPath()), $frame->getClientOriginalName());
+            }
+        }
+
+        return $pending->post($faceUrl . $endpoint, [
+            'session_id' => $request->input('session_id'),
+            'interval_ms' => $request->input('interval_ms', 100),
+            'output_mode' => config('services.face.output_mode')
+        ]);
+    }
+
+    /**
+     * Clean up a verification session: its database entry and the face
+     * verification service's in-memory session and debug images
      * 
      * @param string $sessionId
      * @param bool $checkForSuccessToken Whether to check if the session has a valid token before deletion
      * @return bool
      */
-    private function cleanupSessionFiles(string $sessionId, bool $checkForSuccessToken = true)
+    private function cleanupSession(string $sessionId, bool $checkForSuccessToken = true)
     {
         try {
             // Check if we need to protect successful verifications
@@ -514,28 +571,10 @@ private function cleanupSessionFiles(string $sessionId, bool $checkForSuccessTok
                 }
             }
             
-            // Now also clean up the database entry
             $this->cleanupDatabaseEntry($sessionId);
-            
-            // Define the session directory path
-            $sessionDir = storage_path('app' . DIRECTORY_SEPARATOR . 'face_verification' . DIRECTORY_SEPARATOR . $sessionId);
-            
-            // Check if directory exists
-            if (!File::exists($sessionDir)) {
-                Log::info("Session directory does not exist: {$sessionDir}");
-                return true;
-            }
-            
-            // Attempt to remove the entire session directory
-            if (File::deleteDirectory($sessionDir)) {
-                Log::info("Successfully cleaned up session files for session: {$sessionId}");
-                return true;
-            }
-            
-            Log::error("Failed to clean up session files for session: {$sessionId}");
-            return false;
+            return $this->dropFaceSession($sessionId);
         } catch (\Exception $e) {
-            Log::error("Error during session file cleanup: " . $e->getMessage());
+            Log::error("Error during session cleanup: " . $e->getMessage());
             return false;
         }
     }
@@ -591,8 +630,8 @@ public function cleanup(Request $request)
         
         $sessionId = $request->input('session_id');
         
-        // Clean up files and database entry without checking for success token
-        $this->cleanupSessionFiles($sessionId, false);
+        // Clean up the session without checking for success token
+        $this->cleanupSession($sessionId, false);
         
         return response()->json([
             'success' => true,
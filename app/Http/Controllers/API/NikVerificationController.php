@@ -8,6 +8,8 @@
 use Illuminate\Support\Facades\Validator;
 use App\Models\UserProfile;
 use Illuminate\Support\Facades\Hash;
+use Illuminate\Support\Facades\Http;
+use Illuminate\Support\Facades\Crypt;
 use Illuminate\Support\Facades\Log;
 
 
@@ -59,18 +61,13 @@ public function extractNik(Request $request)
             $imagePath = $request->file('id_card_image')->getPathname();
             $imageName = $request->file('id_card_image')->getClientOriginalName();
 
-            $client = new \GuzzleHttp\Client();
-            $response = $client->post('http://127.0.0.1:5000/extract-ktp', [
-                'multipart' => [
-                    [
-                        'name' => 'id_card_image',
-                        'contents' => fopen($imagePath, 'r'),
-                        'filename' => $imageName,
-                    ],
-                ],
-            ]);
+            // The OCR service keeps the KTP portrait for the selfie match
+            // during face verification, under an id it returns
+            $ocrUrl = rtrim(config('services.ocr.url'), '/');
+            $response = Http::attach('id_card_image', file_get_contents($imagePath), $imageName)
+                ->post($ocrUrl . '/extract-ktp');
 
-            $responseData = json_decode($response->getBody(), true);
+            $responseData = $response->json();
 
             if (!isset($responseData['data']) || 
                 !isset($responseData['data']['NIK'], 
@@ -85,6 +82,10 @@ public function extractNik(Request $request)
                 'nik' => $responseData['data']['NIK'],
                 'name' => $responseData['data']['Nama'],
                 'dob' => $responseData['data']['Tanggal Lahir'],
+                // Encrypted so the client can only carry it to /update-registration-file
+                'ktp_face_token' => isset($responseData['ktp_face_id'])
+                    ? Crypt::encryptString($responseData['ktp_face_id'])
+                    : null,
                 'redirect' => route('ocr.form') // Redirect to verification page
             ]);
         } catch (\Exception $e) {
@@ -98,6 +99,11 @@ public function extractNik(Request $request)
 
     public function OcrFileSessionUpdate(Request $request)
     {
+        // Face verification sends this back to match the selfie against the KTP photo
+        $registrationData = session('registration_data', []);
+        $registrationData['ktp_face_token'] = $request->input('ktp_face_token');
+        session(['registration_data' => $registrationData]);
+
         session(['registration_step' => 4]);
     }
 
@@ -0,0 +1,235 @@
+import base64
+import datetime
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+# A4 in points
+A4 = (595, 842)
+
+# Sample holder written on synthetic KTP images and OCR output
+KTP_HOLDER = {"NIK": "3171234567890123", "Nama": "BUDI SANTOSO", "Tanggal Lahir": "17-08-1990"}
+
+
+# ====== Documents and credentials ======
+
+def make_pdf(pages, page_size=A4, lines_per_page=40):
+    """
+    Build a plain PDF with pages of text. lines_per_page controls the
+    content stream size, and so the file size, of each page.
+    """
+    width, height = page_size
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        text = [b"BT /F1 10 Tf 50 %d Td 12 TL" % (height - 60)]
+        for line in range(lines_per_page):
+            text.append(b"(Page %d line %d: benchmark fixture text for the signing service) '" % (page + 1, line + 1))
+        text.append(b"ET")
+        content = b"\n".join(text)
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (width, height, len(objects))
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = BytesIO()
+    out.write(b"%PDF-1.7\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_credentials(key_size=2048):
+    """Return (certificate PEM, private key PEM) for a self-signed test signer."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=key_size)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "Benchmark Signer")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=30))
+        .add_extension(x509.KeyUsage(
+            digital_signature=True, content_commitment=True, key_encipherment=False,
+            data_encipherment=False, key_agreement=False, key_cert_sign=False,
+            crl_sign=False, encipher_only=False, decipher_only=False
+        ), critical=True)
+        .add_extension(x509.ExtendedKeyUsage([ExtendedKeyUsageOID.EMAIL_PROTECTION]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_pem = cert.public_bytes(serialization.Encoding.PEM)
+    key_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+    return cert_pem, key_pem
+
+
+def make_signature_png(width=300, height=100):
+    """A handwritten-looking stroke on a transparent background."""
+    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    points = [(10 + i * (width - 20) / 30, height / 2 + (height / 3) * ((-1) ** i) * (i % 4) / 3) for i in range(31)]
+    draw.line(points, fill=(20, 20, 120, 255), width=3)
+    out = BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+def make_boxes(pages, count=1, image=None):
+    """boxes.json entries spread over the document, one per page in turn."""
+    content = None
+    if image:
+        content = "data:image/png;base64," + base64.b64encode(image).decode()
+    boxes = []
+    for i in range(count):
+        box = {
+            "box_id": f"Signature{i + 1}",
+            "page": i % pages + 1,
+            "rel_x": 0.6,
+            "rel_y": 0.8 - 0.1 * (i // pages),
+            "rel_width": 0.25,
+            "rel_height": 0.08,
+        }
+        if content:
+            box["content"] = content
+        boxes.append(box)
+    return boxes
+
+
+# ====== Images ======
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow before 10.1 has a single bitmap size
+        return ImageFont.load_default()
+
+
+def _encode(img, quality=90):
+    out = BytesIO()
+    img.convert("RGB").save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+
+def draw_face(draw, box, eyes_closed=False, smiling=False):
+    """Draw a frontal cartoon face inside box = (x0, y0, x1, y1)."""
+    x0, y0, x1, y1 = box
+    w, h = x1 - x0, y1 - y0
+    draw.ellipse(box, fill=(224, 172, 140))
+    for ex in (x0 + w * 0.32, x0 + w * 0.68):
+        ey = y0 + h * 0.4
+        if eyes_closed:
+            draw.line([(ex - w * 0.08, ey), (ex + w * 0.08, ey)], fill=(40, 30, 30), width=max(2, int(w * 0.02)))
+        else:
+            draw.ellipse([ex - w * 0.08, ey - h * 0.04, ex + w * 0.08, ey + h * 0.04], fill=(255, 255, 255))
+            draw.ellipse([ex - w * 0.03, ey - h * 0.03, ex + w * 0.03, ey + h * 0.03], fill=(40, 30, 30))
+    draw.polygon([(x0 + w * 0.5, y0 + h * 0.45), (x0 + w * 0.45, y0 + h * 0.62), (x0 + w * 0.55, y0 + h * 0.62)],
+                 fill=(200, 140, 110))
+    mouth_w = 0.2 if smiling else 0.13
+    draw.arc([x0 + w * (0.5 - mouth_w), y0 + h * 0.66, x0 + w * (0.5 + mouth_w), y0 + h * 0.8],
+             0, 180, fill=(150, 50, 50), width=max(2, int(w * 0.02)))
+
+
+def make_face_image(size=(640, 480), eyes_closed=False, smiling=False):
+    """JPEG bytes of a synthetic selfie with one face in the middle."""
+    width, height = size
+    img = Image.new("RGB", size, (180, 190, 200))
+    face_w = int(min(width, height) * 0.45)
+    x0, y0 = (width - face_w) // 2, (height - int(face_w * 1.3)) // 2
+    draw_face(ImageDraw.Draw(img), (x0, y0, x0 + face_w, y0 + int(face_w * 1.3)), eyes_closed, smiling)
+    return _encode(img)
+
+
+def make_ktp_image(width=1280, holder=KTP_HOLDER, margin=0.06):
+    """
+    JPEG bytes of a KTP-like card on a darker background. Labels and values
+    sit where idcardocr.layout expects the fields, with a portrait on the
+    right, so both full-card and per-field OCR have something to read.
+    """
+    card_w = int(width * (1 - 2 * margin))
+    card_h = int(card_w * 540 / 856)
+    height = card_h + int(width * 2 * margin)
+    img = Image.new("RGB", (width, height), (60, 60, 60))
+    left, top = (width - card_w) // 2, (height - card_h) // 2
+
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([left, top, left + card_w, top + card_h], fill=(170, 205, 230))
+    font = _font(max(12, card_h // 22))
+    title = _font(max(14, card_h // 18))
+
+    def at(fx, fy):
+        return left + int(fx * card_w), top + int(fy * card_h)
+
+    draw.text(at(0.3, 0.03), "PROVINSI DKI JAKARTA", fill=(0, 0, 0), font=title)
+    draw.text(at(0.04, 0.17), "NIK", fill=(0, 0, 0), font=title)
+    draw.text(at(0.18, 0.17), ":", fill=(0, 0, 0), font=title)
+    draw.text(at(0.23, 0.17), holder["NIK"], fill=(0, 0, 0), font=title)
+    rows = [
+        ("Nama", holder["Nama"]),
+        ("Tempat/Tgl Lahir", "JAKARTA, " + holder["Tanggal Lahir"]),
+        ("Jenis Kelamin", "LAKI-LAKI"),
+        ("Alamat", "JL. MERDEKA NO. 1"),
+        ("Agama", "ISLAM"),
+        ("Pekerjaan", "KARYAWAN SWASTA"),
+    ]
+    for i, (label, value) in enumerate(rows):
+        y = 0.28 + i * 0.08
+        draw.text(at(0.04, y), label, fill=(0, 0, 0), font=font)
+        draw.text(at(0.24, y), ": " + value, fill=(0, 0, 0), font=font)
+
+    px0, py0 = at(0.72, 0.2)
+    px1, py1 = at(0.95, 0.78)
+    draw.rectangle([px0, py0, px1, py1], fill=(200, 40, 40))
+    draw_face(draw, (px0 + (px1 - px0) * 0.1, py0 + (py1 - py0) * 0.08,
+                     px1 - (px1 - px0) * 0.1, py1 - (py1 - py0) * 0.2))
+    return _encode(img)
+
+
+def make_ocr_results(holder=KTP_HOLDER, line_height=40):
+    """EasyOCR-style (bbox, text, confidence) tokens of a full KTP read."""
+    lines = [
+        ["PROVINSI DKI JAKARTA"],
+        ["KOTA JAKARTA SELATAN"],
+        ["NIK", ":", holder["NIK"]],
+        ["Nama", ":", holder["Nama"]],
+        ["Tempat/Tgl Lahir", ":", "JAKARTA, " + holder["Tanggal Lahir"]],
+        ["Jenis Kelamin", ":", "LAKI-LAKI", "Gol. Darah", ":", "O"],
+        ["Alamat", ":", "JL. MERDEKA NO. 1"],
+        ["RT/RW", ":", "001/002"],
+        ["Agama", ":", "ISLAM"],
+        ["Status Perkawinan", ":", "BELUM KAWIN"],
+        ["Pekerjaan", ":", "KARYAWAN SWASTA"],
+        ["Kewarganegaraan", ":", "WNI"],
+        ["Berlaku Hingga", ":", "SEUMUR HIDUP"],
+    ]
+    results = []
+    for row, tokens in enumerate(lines):
+        y = 20 + row * line_height
+        x = 20
+        for token in tokens:
+            w = 12 * len(token)
+            results.append(([[x, y], [x + w, y], [x + w, y + 30], [x, y + 30]], token, 0.92))
+            x += w + 15
+    return results
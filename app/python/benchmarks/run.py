@@ -0,0 +1,214 @@
+"""
+Offline benchmarks for the signing, OCR and liveness hot paths.
+
+Every stage/parameter case runs in a fresh spawned process. The cold start
+is the time from process start to the end of the first request: imports,
+fixture generation, model or credential loading and one call. The process
+then runs warmup calls and times the warm iterations, reporting latency
+percentiles, single-thread throughput and the process's peak RSS.
+
+    python benchmarks/run.py                      # every stage
+    python benchmarks/run.py sign ocr_parse -n 50 -o bench.json
+    python benchmarks/run.py --compare baseline.json -o bench.json
+
+Stages whose dependencies or model files are missing, or whose first call
+does not reach the path being measured (no face found in a synthetic
+selfie), are reported as skipped. With --compare, cases whose warm p50/p99 or cold start grew by more
+than --threshold over the baseline are listed and the exit code is 1.
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+if not __package__:
+    # Run as a script: make the benchmarks package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stages import STAGES
+
+
+def percentile(sorted_values, q):
+    """Linear-interpolated q-th percentile (0-100) of an already sorted list."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies_ms):
+    values = sorted(latencies_ms)
+    total_s = sum(values) / 1000
+    return {
+        "iterations": len(values),
+        "min_ms": values[0],
+        "p50_ms": percentile(values, 50),
+        "p90_ms": percentile(values, 90),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1],
+        "mean_ms": sum(values) / len(values),
+        "throughput_per_s": len(values) / total_s if total_s else None,
+    }
+
+
+def peak_rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def case_name(stage, params):
+    if not params:
+        return stage
+    return stage + "[" + ",".join(f"{k}={v}" for k, v in sorted(params.items())) + "]"
+
+
+def _run_case(stage, params, iterations, warmup, started, results):
+    # Runs in a fresh process so the cold start pays for imports and loading
+    try:
+        setup, _ = STAGES[stage]
+        setup_start = time.perf_counter()
+        try:
+            op = setup(**params)
+        except (ImportError, FileNotFoundError) as e:
+            results.put({"status": "skipped", "error": f"{type(e).__name__}: {e}"})
+            return
+        setup_ms = (time.perf_counter() - setup_start) * 1000
+
+        first_start = time.perf_counter()
+        first = op()
+        first_ms = (time.perf_counter() - first_start) * 1000
+        cold_ms = (time.time() - started) * 1000
+
+        # A synthetic fixture the model does not recognize would time an early return
+        check = getattr(op, 'check', None)
+        reason = check(first) if check else None
+        if reason:
+            results.put({"status": "skipped", "error": reason})
+            return
+
+        for _ in range(warmup):
+            op()
+        latencies = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            op()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        results.put({
+            "status": "ok",
+            "cold": {"start_ms": cold_ms, "setup_ms": setup_ms, "first_call_ms": first_ms},
+            "warm": summarize(latencies),
+            "peak_rss_mb": peak_rss_mb(),
+        })
+    except Exception as e:
+        results.put({"status": "error", "error": f"{type(e).__name__}: {e}"})
+
+
+def run_case(stage, params, iterations, warmup, timeout):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(
+        target=_run_case, args=(stage, params, iterations, warmup, time.time(), results)
+    )
+    process.start()
+    try:
+        outcome = results.get(timeout=timeout)
+    except Exception:
+        outcome = {"status": "error", "error": f"No result within {timeout}s"}
+    process.join(5)
+    if process.is_alive():
+        process.kill()
+    return {"case": case_name(stage, params), "stage": stage, "params": params, **outcome}
+
+
+def compare(results, baseline, threshold):
+    """Return (case, metric, baseline, current) for every regression beyond threshold."""
+    previous = {entry["case"]: entry for entry in baseline["results"] if entry["status"] == "ok"}
+    regressions = []
+    for entry in results:
+        base = previous.get(entry["case"])
+        if entry["status"] != "ok" or base is None:
+            continue
+        for section, metric in (("warm", "p50_ms"), ("warm", "p99_ms"), ("cold", "start_ms")):
+            old, new = base[section][metric], entry[section][metric]
+            if old and new > old * (1 + threshold):
+                regressions.append((entry["case"], f"{section}.{metric}", old, new))
+    return regressions
+
+
+def print_table(results):
+    header = f"{'case':<48} {'cold ms':>10} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'ops/s':>9} {'rss MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for entry in results:
+        if entry["status"] != "ok":
+            print(f"{entry['case']:<48} {entry['status']}: {entry['error']}")
+            continue
+        warm = entry["warm"]
+        print(f"{entry['case']:<48} {entry['cold']['start_ms']:>10.1f} {warm['p50_ms']:>10.2f} "
+              f"{warm['p90_ms']:>10.2f} {warm['p99_ms']:>10.2f} {warm['throughput_per_s']:>9.2f} "
+              f"{entry['peak_rss_mb']:>8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the signing, OCR and liveness hot paths.")
+    parser.add_argument('stages', nargs='*', metavar='stage',
+                        help=f"Stages to run (default: all of {', '.join(STAGES)})")
+    parser.add_argument('--iterations', '-n', type=int, default=20, help="Timed warm calls per case")
+    parser.add_argument('--warmup', type=int, default=3, help="Untimed calls after the first one")
+    parser.add_argument('--params', type=json.loads, default=None,
+                        help="JSON parameters to run instead of each stage's defaults")
+    parser.add_argument('--timeout', type=float, default=900, help="Seconds allowed per case")
+    parser.add_argument('--output', '-o', help="Write results as JSON here")
+    parser.add_argument('--compare', help="Baseline JSON from an earlier run")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="Allowed relative slowdown against the baseline (default 0.1)")
+    args = parser.parse_args(argv)
+    unknown = [stage for stage in args.stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage: {', '.join(unknown)}")
+
+    results = []
+    for stage in args.stages or list(STAGES):
+        for params in ([args.params] if args.params is not None else STAGES[stage][1]):
+            print(f"Running {case_name(stage, params)}...", file=sys.stderr)
+            results.append(run_case(stage, params, args.iterations, args.warmup, args.timeout))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+        },
+        "results": results,
+    }
+    print_table(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for case, metric, old, new in regressions:
+            print(f"REGRESSION {case} {metric}: {old:.2f} -> {new:.2f}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+from benchmarks import fixtures
+
+# Each stage's setup(**params) builds its fixtures, loads what the service
+# keeps loaded between requests, and returns the operation one request
+# runs. Setup is timed as part of the cold start. An operation may carry a
+# check(result) that returns why its first result does not exercise the
+# intended path, and the case is then reported as skipped.
+
+
+def _decode(data):
+    import cv2
+    import numpy as np
+
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def setup_sign(pages=1, boxes=1, lines_per_page=40, signer='fresh', key_size=2048):
+    """
+    sign_document on a generated PDF. signer='fresh' parses the credentials
+    on every call like the CLI does; 'cached' reuses one loaded signer like
+    the signing service's SignerCache.
+    """
+    from documentsigning.apply_signature import load_signer, sign_document
+
+    pdf = fixtures.make_pdf(pages, lines_per_page=lines_per_page)
+    cert_pem, key_pem = fixtures.make_credentials(key_size)
+    sig_boxes = fixtures.make_boxes(pages, boxes, fixtures.make_signature_png())
+    loaded = load_signer(cert_pem, key_pem) if signer == 'cached' else None
+
+    def op():
+        return sign_document(pdf, cert_pem, sig_boxes, private_key=key_pem, signer=loaded)
+    return op
+
+
+def setup_ocr_ingest(width=3000, max_side=1280, grayscale=False):
+    """Decode and downsample an upload the way ocr_api does before OCR."""
+    from idcardocr.ingest import prepare_image
+
+    data = fixtures.make_ktp_image(width)
+
+    def op():
+        return prepare_image(data, max_side=max_side, grayscale=grayscale)
+    return op
+
+
+def setup_ocr_parse(copies=1):
+    """Parse full-card OCR tokens into KTP fields (no OCR model involved)."""
+    from idcardocr.parsing import parse_ktp_results
+
+    results = fixtures.make_ocr_results() * copies
+
+    def op():
+        return parse_ktp_results(results)
+    return op
+
+
+def setup_ocr(mode='fields', width=1280):
+    """EasyOCR on a synthetic KTP plus parsing: per-field or full-card reads."""
+    from idcardocr.ingest import prepare_image
+    from idcardocr.layout import read_fields
+    from idcardocr.parsing import parse_ktp_fields, parse_ktp_results
+    from idcardocr.worker_pool import _plain_results, load_reader, readtext_batch
+
+    reader = load_reader()
+    image = prepare_image(fixtures.make_ktp_image(width), max_side=width)
+
+    def op():
+        if mode == 'fields':
+            return parse_ktp_fields(read_fields(reader, image))
+        return parse_ktp_results(_plain_results(readtext_batch(reader, [image])[0]))
+    return op
+
+
+def setup_face_detect(backend='haar', width=1280):
+    """Face detection on a synthetic selfie with the given detector backend."""
+    from faceverification.detectors import create_detector
+    from faceverification.face_detection import detect_faces
+
+    detector = create_detector(backend)
+    image = _decode(fixtures.make_face_image((width, width * 3 // 4)))
+
+    def op():
+        return detect_faces(detector, image)
+    op.check = lambda face_data: None if face_data["faces"] else f"{backend} found no face in the synthetic selfie"
+    return op
+
+
+def setup_liveness(width=640):
+    """One landmark pass scoring every liveness gesture on a selfie."""
+    from faceverification.liveness import create_landmarker, score_image
+
+    landmarker = create_landmarker()
+    image = _decode(fixtures.make_face_image((width, width * 3 // 4)))
+
+    def op():
+        return score_image(landmarker, image)
+    op.check = lambda result: None if result[0] is not None else "No face landmarks in the synthetic selfie"
+    return op
+
+
+def setup_liveness_stream(challenge='blink', frames=30, width=640):
+    """Track a burst of frames for one challenge; the eyes close halfway through."""
+    from faceverification.liveness import TrackingLandmarker, run_stream
+
+    tracker = TrackingLandmarker()
+    size = (width, width * 3 // 4)
+    burst = [
+        (i * 100.0, _decode(fixtures.make_face_image(size, eyes_closed=i >= frames // 2)))
+        for i in range(frames)
+    ]
+
+    def op():
+        return run_stream(tracker, challenge, iter(burst))
+    op.check = lambda result: None if result[1]["face_frames"] else "No face tracked in the synthetic burst"
+    return op
+
+
+# name -> (setup, parameter sets run by default)
+STAGES = {
+    'sign': (setup_sign, [
+        {'pages': 1}, {'pages': 10}, {'pages': 100},
+        {'pages': 10, 'lines_per_page': 400},
+        {'pages': 10, 'boxes': 5},
+        {'pages': 10, 'signer': 'cached'},
+    ]),
+    'ocr_ingest': (setup_ocr_ingest, [{'width': 1280}, {'width': 4000}]),
+    'ocr_parse': (setup_ocr_parse, [{}]),
+    'ocr': (setup_ocr, [{'mode': 'fields'}, {'mode': 'full'}]),
+    'face_detect': (setup_face_detect, [{'backend': 'haar'}, {'backend': 'mediapipe'}]),
+    'liveness': (setup_liveness, [{}]),
+    'liveness_stream': (setup_liveness_stream, [{'challenge': 'blink'}]),
+}
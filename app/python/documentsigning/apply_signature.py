@@ -2,45 +2,76 @@ import sys
 import json
 import base64
 import os
-from pathlib import Path
-import pikepdf
-from PIL import Image
+import shutil
+import tempfile
+from contextlib import nullcontext
+from io import BytesIO
+from pyhanko.keys import load_certs_from_pemder_data, load_private_key_from_pemder_data
 from pyhanko.sign import signers
 from pyhanko.sign.signers import PdfSigner, PdfSignatureMetadata
 from pyhanko.stamp import TextStampStyle
-from pyhanko.pdf_utils.images import PdfImage
 from pyhanko.pdf_utils.incremental_writer import IncrementalPdfFileWriter
 from pyhanko.sign.fields import SigFieldSpec, append_signature_field
 from pyhanko.pdf_utils.layout import SimpleBoxLayoutRule, AxisAlignment, InnerScaling, Margins
 from pyhanko.pdf_utils.text import TextBoxStyle
+from pyhanko_certvalidator.registry import SimpleCertificateStore
 
-# ====== Get input arguments ======
-# Required:
-# 1. input_pdf_path
-# 2. cert_file
-# 3. signature_image_path (decoded from base64 by controller)
-# 4. boxes_json_path
-# 5. output_pdf_path
-# Optional:
-# 6. private_key_path
+if not __package__:
+    # Run as a script: make the documentsigning package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documentsigning.stamp_cache import CachedPdfImage, stamp_cache
+
+
+# ====== Signing engine ======
+# Importable by the signing service so a signature does not pay for a fresh
+# interpreter and cold imports. The CLI at the bottom is a thin wrapper.
+
+# Documents up to this size stay in memory; larger ones spill to disk
+SPOOL_MAX_BYTES = int(os.environ.get('DOCUMENT_SPOOL_BYTES', 8 * 1024 * 1024))
+
+
+def spooled_copy(stream):
+    """Copy a binary stream into a spooled buffer that can be signed in place."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode='w+b')
+    shutil.copyfileobj(stream, spool)
+    spool.seek(0)
+    return spool
+
+def _read_bytes(source):
+    """Return the contents of bytes, a path or a binary stream."""
+    if source is None or isinstance(source, (bytes, bytearray)):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    return source.read()
 
-if len(sys.argv) < 6:
-    print("Usage: python apply_signature.py <input_pdf> <cert_file> <signature_image> <boxes_json> <output_pdf> [<private_key>]")
-    sys.exit(1)
 
-input_pdf_path = sys.argv[1]
-cert_file = sys.argv[2]
-signature_image_path = sys.argv[3]
-boxes_json_path = sys.argv[4]
-output_pdf_path = sys.argv[5]
-private_key_path = sys.argv[6] if len(sys.argv) > 6 else None
+def _as_stream(source):
+    """Return a seekable binary stream for bytes, a path or a stream."""
+    if isinstance(source, (bytes, bytearray)):
+        return BytesIO(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return BytesIO(f.read())
+    return source
 
-# ====== Parse boxes.json ======
-with open(boxes_json_path, "r") as f:
-    boxes_data = json.load(f)
 
-def parse_signature_box(json_data):
-    data = json_data[0]
+def _as_writable_stream(source):
+    """Return a seekable stream that can be signed in place."""
+    stream = _as_stream(source)
+    try:
+        writable = stream.writable()
+    except AttributeError:
+        # SpooledTemporaryFile before Python 3.11 has no writable()
+        writable = '+' in getattr(stream, 'mode', '')
+    if writable:
+        return stream
+    return spooled_copy(stream)
+
+
+def parse_signature_box(data):
     signature_image = None
     if 'content' in data and data['content'].startswith('data:image'):
         img_data = data['content'].split(',')[1]
@@ -55,82 +86,200 @@ def parse_signature_box(json_data):
         'box_id': data['box_id']
     }
 
-sig_box = parse_signature_box(boxes_data)
-
-# Save image to PNG via Pillow
-temp_img_path = Path(signature_image_path)
-if sig_box["image"]:
-    temp_img_path.write_bytes(sig_box["image"])
-    with Image.open(temp_img_path) as img:
-        pil_image = img.convert("RGBA")
-        background_image = PdfImage(pil_image)
-
-# Calculate absolute coordinates
-with pikepdf.open(input_pdf_path) as pdf:
-    page_obj = pdf.pages[sig_box['page'] - 1]
-    media_box = page_obj.get('/MediaBox', [0, 0, 612, 792])
-    page_width = float(media_box[2])
-    page_height = float(media_box[3])
-
-x1 = sig_box['x'] * page_width
-y1 = (1 - sig_box['y'] - sig_box['height']) * page_height
-x2 = (sig_box['x'] + sig_box['width']) * page_width
-y2 = (1 - sig_box['y']) * page_height
-
-if x1 == x2:
-    x2 += 100
-if y1 == y2:
-    y2 += 50
-
-field_name = sig_box['box_id']
-field_spec = SigFieldSpec(sig_field_name=field_name, box=(x1, y1, x2, y2), on_page=sig_box['page'] - 1)
-
-# Load signer
-signer = signers.SimpleSigner.load(
-    cert_file=cert_file,
-    key_file=private_key_path if private_key_path else cert_file,
-    key_passphrase=None
-)
-
-# Use full layout rule with default margins to avoid error
-stamp_style = TextStampStyle(
-    stamp_text="",  # Optional text
-    background=background_image,
-    background_layout=SimpleBoxLayoutRule(
-        x_align=AxisAlignment.ALIGN_MID,
-        y_align=AxisAlignment.ALIGN_MID,
-        margins=Margins(left=0, right=0, top=0, bottom=0),
-        inner_content_scaling=InnerScaling.STRETCH_FILL
-    ),
-    background_opacity=1.0,
-    text_box_style=TextBoxStyle(
-        font_size=10,
-        border_width=0
+
+def parse_signature_boxes(json_data):
+    """
+    Parse every box in boxes.json. Boxes are signed in the order they are
+    listed, each in its own incremental revision, so the last box listed is
+    the outermost signature.
+    """
+    sig_boxes = [parse_signature_box(data) for data in json_data]
+    if not sig_boxes:
+        raise ValueError("No signature boxes given")
+
+    field_names = [sig_box['box_id'] for sig_box in sig_boxes]
+    if len(set(field_names)) != len(field_names):
+        raise ValueError("Signature box ids must be unique")
+    return sig_boxes
+
+
+def load_signer(certificate, private_key=None):
+    """
+    Build a SimpleSigner from PEM/DER certificate and key data.
+    When no private key is given the certificate data must contain it.
+    """
+    cert_data = _read_bytes(certificate)
+    key_data = _read_bytes(private_key) if private_key is not None else cert_data
+
+    certs = list(load_certs_from_pemder_data(cert_data))
+    if not certs:
+        raise ValueError("No certificate found in certificate data")
+    signing_key = load_private_key_from_pemder_data(key_data, passphrase=None)
+
+    return signers.SimpleSigner(
+        signing_cert=certs[0],
+        signing_key=signing_key,
+        cert_registry=SimpleCertificateStore.from_certs(certs)
     )
-)
 
-# Append signature field and sign
-with open(input_pdf_path, "rb+") as doc_stream:
-    writer = IncrementalPdfFileWriter(doc_stream)
-    append_signature_field(writer, field_spec)
 
-    pdf_signer = PdfSigner(
-        signature_meta=PdfSignatureMetadata(field_name=field_name),
-        signer=signer,
-        stamp_style=stamp_style,
+def build_stamp_style(image_bytes):
+    # Identical signature images are decoded and encoded once, then reused
+    background_image = None
+    if image_bytes:
+        background_image = CachedPdfImage(stamp_cache.get_stamp(image_bytes))
+
+    # Use full layout rule with default margins to avoid error
+    return TextStampStyle(
+        stamp_text="",  # Optional text
+        background=background_image,
+        background_layout=SimpleBoxLayoutRule(
+            x_align=AxisAlignment.ALIGN_MID,
+            y_align=AxisAlignment.ALIGN_MID,
+            margins=Margins(left=0, right=0, top=0, bottom=0),
+            inner_content_scaling=InnerScaling.STRETCH_FILL
+        ),
+        background_opacity=1.0,
+        text_box_style=TextBoxStyle(
+            font_size=10,
+            border_width=0
+        )
     )
 
-    with open(output_pdf_path, "wb") as outf:
-        pdf_signer.sign_pdf(writer, output=outf)
 
-print(f" Signature applied successfully.")
-print(f" Signed PDF saved at: {os.path.abspath(output_pdf_path)}")
+def _inherited_page_attr(page, name):
+    # MediaBox, CropBox and Rotate may be inherited from the page tree
+    node = page
+    while node is not None:
+        if name in node:
+            return node[name]
+        node = node['/Parent'] if '/Parent' in node else None
+    return None
+
+
+def page_geometry(writer, page_ix):
+    """
+    Return the visible box (llx, lly, urx, ury) and rotation of a page,
+    read from the pyhanko reader that is already open for signing.
+    """
+    page_ref, _ = writer.find_page_for_modification(page_ix)
+    page = page_ref.get_object()
+    media_box = _inherited_page_attr(page, '/MediaBox') or [0, 0, 612, 792]
+    crop_box = _inherited_page_attr(page, '/CropBox') or media_box
+    rotate = int(_inherited_page_attr(page, '/Rotate') or 0) % 360
+
+    x1, y1, x2, y2 = (float(v) for v in crop_box)
+    return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)), rotate
+
+
+def _to_user_space(box, rotate, u, v):
+    # (u, v) are fractions of the displayed page measured from its top-left
+    # corner; map them back through the page rotation into PDF user space.
+    llx, lly, urx, ury = box
+    width = urx - llx
+    height = ury - lly
+    if rotate == 90:
+        return llx + v * width, lly + u * height
+    if rotate == 180:
+        return urx - u * width, lly + v * height
+    if rotate == 270:
+        return urx - v * width, ury - u * height
+    return llx + u * width, ury - v * height
+
+
+def signature_field_spec(writer, sig_box):
+    # Calculate absolute coordinates
+    page_ix = sig_box['page'] - 1
+    box, rotate = page_geometry(writer, page_ix)
+
+    ax, ay = _to_user_space(box, rotate, sig_box['x'], sig_box['y'])
+    bx, by = _to_user_space(box, rotate, sig_box['x'] + sig_box['width'], sig_box['y'] + sig_box['height'])
+    x1, x2 = min(ax, bx), max(ax, bx)
+    y1, y2 = min(ay, by), max(ay, by)
+
+    if x1 == x2:
+        x2 += 100
+    if y1 == y2:
+        y2 += 50
+
+    return SigFieldSpec(sig_field_name=sig_box['box_id'], box=(x1, y1, x2, y2), on_page=page_ix)
+
+
+def sign_document(document, certificate, boxes, private_key=None, output=None, signer=None, stage=None):
+    """
+    Apply every signature box to a PDF and return the signed stream.
+
+    document, certificate and private_key may be bytes, paths or binary
+    streams; boxes is the parsed boxes.json list. A preloaded signer skips
+    credential parsing. Writable document streams are signed in place and
+    returned; otherwise the result is copied to output when given, or
+    returned as a new BytesIO. stage, when given, is a stage(name) context
+    manager factory timing 'pdf_parse', 'sign' and 'write'.
+    """
+    stage = stage or (lambda name: nullcontext())
+    sig_boxes = parse_signature_boxes(boxes)
+    doc_stream = _as_writable_stream(document)
+    if signer is None:
+        signer = load_signer(certificate, private_key)
+
+    # One incremental revision per box, appended to the same stream
+    for sig_box in sig_boxes:
+        with stage('pdf_parse'):
+            doc_stream.seek(0)
+            writer = IncrementalPdfFileWriter(doc_stream)
+            field_spec = signature_field_spec(writer, sig_box)
+            append_signature_field(writer, field_spec)
+
+        with stage('sign'):
+            pdf_signer = PdfSigner(
+                signature_meta=PdfSignatureMetadata(field_name=field_spec.sig_field_name),
+                signer=signer,
+                stamp_style=build_stamp_style(sig_box['image']),
+            )
+            pdf_signer.sign_pdf(writer, in_place=True)
+
+    doc_stream.seek(0)
+    if output is None:
+        return doc_stream
+    with stage('write'):
+        shutil.copyfileobj(doc_stream, output)
+    output.seek(0)
+    return output
+
+
+# ====== Command line wrapper ======
+# Required:
+# 1. input_pdf_path
+# 2. cert_file
+# 3. signature_image_path (unused; the image is taken from boxes.json)
+# 4. boxes_json_path
+# 5. output_pdf_path
+# Optional:
+# 6. private_key_path
+
+def main(argv):
+    if len(argv) < 6:
+        print("Usage: python apply_signature.py <input_pdf> <cert_file> <signature_image> <boxes_json> <output_pdf> [<private_key>]")
+        return 1
+
+    input_pdf_path = argv[1]
+    cert_file = argv[2]
+    boxes_json_path = argv[4]
+    output_pdf_path = argv[5]
+    private_key_path = argv[6] if len(argv) > 6 else None
+
+    with open(boxes_json_path, "r") as f:
+        boxes_data = json.load(f)
+
+    # Sign a copy of the input in place so the document is never held in memory
+    shutil.copyfile(input_pdf_path, output_pdf_path)
+    with open(output_pdf_path, "rb+") as doc_stream:
+        sign_document(doc_stream, cert_file, boxes_data, private_key=private_key_path)
+
+    print(f" Signature applied successfully.")
+    print(f" Signed PDF saved at: {os.path.abspath(output_pdf_path)}")
+    return 0
 
-# Clean up temp image
-try:
-    if temp_img_path.exists():
-        os.remove(temp_img_path)
-        print(f" Temporary signature image removed: {temp_img_path}")
-except PermissionError:
-    print(f" Warning: Could not remove temp image; file may still be in use: {temp_img_path}")
 
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,79 @@
+import base64
+import os
+import tarfile
+import zipfile
+from concurrent.futures import as_completed, wait
+
+from documentsigning.apply_signature import sign_document, spooled_copy
+
+
+def iter_archive_documents(stream):
+    """
+    Yield (name, stream) for every PDF in a zip or tar archive.
+
+    Zip archives need a seekable stream; tar archives (optionally
+    compressed) are read sequentially so they can be streamed.
+    """
+    if zipfile.is_zipfile(stream):
+        stream.seek(0)
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith('.pdf'):
+                    with archive.open(info) as member:
+                        yield info.filename, spooled_copy(member)
+        return
+
+    stream.seek(0)
+    with tarfile.open(fileobj=stream, mode='r|*') as archive:
+        for member in archive:
+            if member.isfile() and member.name.lower().endswith('.pdf'):
+                yield member.name, spooled_copy(archive.extractfile(member))
+
+
+def boxes_for(boxes, name):
+    """
+    Return the boxes for one document. A list applies to every document,
+    a dict maps document names (or base names) to their own list.
+    """
+    if isinstance(boxes, dict):
+        document_boxes = boxes.get(name, boxes.get(os.path.basename(name)))
+        if document_boxes is None:
+            raise ValueError(f"No signature boxes given for {name}")
+        return document_boxes
+    return boxes
+
+
+def _sign_one(name, document, boxes, signer, stage):
+    signed = sign_document(document, None, boxes_for(boxes, name), signer=signer, stage=stage)
+    return signed.read()
+
+
+def sign_batch(documents, boxes, signer, executor, stage=None):
+    """
+    Sign (name, stream) pairs concurrently with one signer and yield a
+    per-document status dict as each one completes. stage is passed on to
+    sign_document. Closing the generator early cancels the documents not
+    started yet and waits for the running ones, so the caller may then
+    close every stream.
+    """
+    futures = {
+        executor.submit(_sign_one, name, document, boxes, signer, stage): name
+        for name, document in documents
+    }
+    try:
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                signed = future.result()
+            except Exception as e:
+                yield {'document': name, 'success': False, 'error': str(e)}
+            else:
+                yield {
+                    'document': name,
+                    'success': True,
+                    'signed_pdf': base64.b64encode(signed).decode('ascii')
+                }
+    finally:
+        for future in futures:
+            future.cancel()
+        wait(futures)
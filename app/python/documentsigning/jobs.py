@@ -0,0 +1,112 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at capacity."""
+
+
+class SigningJob:
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+        if self.error is not None:
+            data['error'] = self.error
+        return data
+
+
+class JobQueue:
+    """
+    Bounded pool of signing workers. At most max_pending jobs may be queued
+    or running at once; further submissions raise QueueFull so callers can
+    back off. Finished jobs are kept for result_ttl seconds; purge_expired()
+    releases older ones, and with them their results, even when no new
+    jobs arrive.
+
+    Streams passed as positional arguments belong to the job: when fn
+    raises they are closed, since no result will ever hand them back.
+    """
+
+    def __init__(self, workers=4, max_pending=64, result_ttl=600):
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            self._purge_finished()
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"{self._pending} signing jobs already pending")
+            job = SigningJob()
+            self._jobs[job.id] = job
+            self._pending += 1
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def pop(self, job_id):
+        with self._lock:
+            return self._jobs.pop(job_id, None)
+
+    def wait(self, job_id, timeout):
+        """Long-poll: block up to timeout seconds for the job to finish."""
+        job = self.get(job_id)
+        if job is not None and timeout > 0:
+            job.done.wait(timeout)
+        return job
+
+    def pending(self):
+        return self._pending
+
+    def purge_expired(self):
+        with self._lock:
+            self._purge_finished()
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = 'running'
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = 'done'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+            for arg in args:
+                if hasattr(arg, 'read') and hasattr(arg, 'close'):
+                    arg.close()
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._pending -= 1
+            job.done.set()
+
+    def _purge_finished(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if job.result is not None:
+                job.result.close()
@@ -0,0 +1,58 @@
+import hashlib
+import hmac
+import os
+
+from servicecommon.cache import BoundedCache
+from documentsigning.apply_signature import _read_bytes, load_signer
+
+# Keys are HMACs under a per-process secret, so the cache never holds a
+# plain digest of private key material that could be matched offline.
+_FINGERPRINT_SECRET = os.urandom(32)
+
+
+def credential_fingerprint(cert_data, key_data=None):
+    digest = hmac.new(_FINGERPRINT_SECRET, digestmod=hashlib.sha256)
+    digest.update(hashlib.sha256(cert_data).digest())
+    digest.update(hashlib.sha256(key_data or b"").digest())
+    return digest.hexdigest()
+
+
+class SignerCache:
+    """
+    Loaded SimpleSigner objects keyed by certificate+key fingerprint.
+
+    Entries expire after ttl seconds and the cache is capped both in
+    entries and in the approximate size of the credentials it holds.
+    Expired signers are dropped on the next access or purge_expired(), which
+    the signing service runs every SIGNER_CACHE_PURGE_INTERVAL seconds. The
+    cache then only drops its reference; the key objects are immutable, so
+    letting them be collected once no request still uses them is as close
+    to zeroing as Python allows.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=8 * 1024 * 1024, ttl=900):
+        self._cache = BoundedCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            ttl=ttl
+        )
+
+    def get_signer(self, certificate, private_key=None):
+        cert_data = _read_bytes(certificate)
+        key_data = _read_bytes(private_key)
+        fingerprint = credential_fingerprint(cert_data, key_data)
+
+        def load():
+            signer = load_signer(cert_data, key_data)
+            return signer, len(cert_data) + len(key_data or b"")
+
+        return self._cache.get_or_create(fingerprint, load)
+
+    def purge_expired(self):
+        self._cache.purge_expired()
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import zlib
+from io import BytesIO
+
+from PIL import Image
+from pyhanko.pdf_utils import generic
+from pyhanko.pdf_utils.images import PdfImage
+
+from servicecommon.cache import BoundedCache
+
+
+class PreparedStamp:
+    """
+    A decoded signature image plus its Flate-encoded PDF image and soft
+    mask streams, ready to be added to any writer without re-encoding.
+    """
+
+    def __init__(self, image_bytes):
+        with Image.open(BytesIO(image_bytes)) as img:
+            self.image = img.convert("RGBA")
+        self.width, self.height = self.image.size
+
+        rgb = self.image.convert("RGB").tobytes()
+        alpha = self.image.getchannel("A").tobytes()
+        self.image_data = zlib.compress(rgb)
+        self.smask_data = zlib.compress(alpha)
+        self.size = len(rgb) + len(alpha) + len(self.image_data) + len(self.smask_data)
+
+    def _image_dict(self, color_space):
+        return {
+            generic.NameObject('/Type'): generic.NameObject('/XObject'),
+            generic.NameObject('/Subtype'): generic.NameObject('/Image'),
+            generic.NameObject('/Width'): generic.NumberObject(self.width),
+            generic.NameObject('/Height'): generic.NumberObject(self.height),
+            generic.NameObject('/ColorSpace'): generic.NameObject(color_space),
+            generic.NameObject('/BitsPerComponent'): generic.NumberObject(8),
+            generic.NameObject('/Filter'): generic.NameObject('/FlateDecode'),
+        }
+
+    def add_to(self, writer):
+        smask = generic.StreamObject(
+            self._image_dict('/DeviceGray'), encoded_data=self.smask_data
+        )
+        image_dict = self._image_dict('/DeviceRGB')
+        image_dict[generic.NameObject('/SMask')] = writer.add_object(smask)
+        return writer.add_object(generic.StreamObject(image_dict, encoded_data=self.image_data))
+
+
+class CachedPdfImage(PdfImage):
+    """PdfImage that writes a PreparedStamp's streams instead of re-encoding."""
+
+    def __init__(self, prepared, **kwargs):
+        super().__init__(prepared.image, **kwargs)
+        self._prepared = prepared
+        self._prepared_ref = None
+        self._prepared_writer = None
+
+    @property
+    def image_ref(self):
+        # One XObject per writer, rebuilt when the style is reused with
+        # another document or revision; the encoded data itself is shared
+        if self._prepared_ref is None or self._prepared_writer is not self.writer:
+            self._prepared_ref = self._prepared.add_to(self.writer)
+            self._prepared_writer = self.writer
+        return self._prepared_ref
+
+
+class StampCache:
+    """LRU cache of prepared signature images keyed by content hash."""
+
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 * 1024):
+        self._cache = BoundedCache(max_entries=max_entries, max_bytes=max_bytes)
+
+    def get_stamp(self, image_bytes):
+        key = hashlib.sha256(image_bytes).hexdigest()
+
+        def prepare():
+            prepared = PreparedStamp(image_bytes)
+            return prepared, prepared.size
+
+        return self._cache.get_or_create(key, prepare)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+stamp_cache = StampCache(
+    max_entries=int(os.environ.get('STAMP_CACHE_ENTRIES', 512)),
+    max_bytes=int(os.environ.get('STAMP_CACHE_BYTES', 64 * 1024 * 1024))
+)
@@ -0,0 +1,247 @@
+from flask import Flask, request, jsonify
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from faceverification.debug_images import DebugImageStore
+from faceverification.face_detection import detect_faces, output_mode
+from faceverification.liveness import CHALLENGES, iter_video_frames, run_challenge, run_stream, score_image
+from faceverification.model_pool import FaceModelPool, PoolBusy
+from faceverification.sessions import SessionStore
+from servicecommon.cache import purge_periodically
+from servicecommon.metrics import ServiceMetrics
+
+app = Flask(__name__)
+
+# Request counts and per-stage timings on GET /metrics
+metrics = ServiceMetrics('face')
+metrics.instrument(app)
+
+# Landmarker sets loaded once and reused across requests; each set loads its
+# face detector (FACE_DETECTOR, default haar) on the first /detect-face
+face_models = FaceModelPool(
+    workers=int(os.environ.get('FACE_WORKERS', os.cpu_count() or 2)),
+    acquire_timeout=float(os.environ.get('FACE_ACQUIRE_TIMEOUT', 30)),
+    detector=os.environ.get('FACE_DETECTOR', 'haar'),
+    on_stage=metrics.observe_stage
+)
+
+# Per-session frames, landmarks and results, kept in memory until the caller
+# has persisted the verdict and drops the session, or until they expire
+face_sessions = SessionStore(
+    max_sessions=int(os.environ.get('FACE_SESSION_ENTRIES', 1024)),
+    max_bytes=int(os.environ.get('FACE_SESSION_BYTES', 512 * 1024 * 1024)),
+    ttl=float(os.environ.get('FACE_SESSION_TTL', 3600))
+)
+
+def busy_face_workers():
+    status = face_models.health()
+    return status['workers'] - status['idle'] if status['healthy'] else None
+
+metrics.gauge_function('busy_workers', busy_face_workers, help="Face model sets in use by a request")
+metrics.gauge_function('model_load_seconds', lambda: face_models.load_seconds,
+                       help="Time taken to load every face model set")
+metrics.gauge_function('sessions', lambda: face_sessions.stats()["entries"],
+                       help="Verification sessions held in memory")
+
+# Longest burst or clip evaluated per stream request
+MAX_STREAM_FRAMES = int(os.environ.get('FACE_MAX_STREAM_FRAMES', 150))
+
+# What responses carry: 'verdict', 'json' (metrics) or 'debug' (metrics plus an
+# annotated image saved as output_name). Requests may override it.
+FACE_OUTPUT_MODE = output_mode(default='verdict')
+
+# Debug images are only ever written below this directory, per session, and
+# removed with their session or once untouched for the session TTL
+debug_images = DebugImageStore(
+    os.environ.get('FACE_DEBUG_DIR') or os.path.join(tempfile.gettempdir(), 'face_verification_debug'),
+    ttl=float(os.environ.get('FACE_SESSION_TTL', 3600))
+)
+
+# Abandoned sessions release their frames even when no request touches them again
+purge_periodically(float(os.environ.get('FACE_SESSION_PURGE_INTERVAL', 300)), face_sessions, debug_images)
+
+def request_output_mode():
+    return output_mode(request.form.get('output_mode') or FACE_OUTPUT_MODE)
+
+def request_session_id():
+    return request.form.get('session_id') or None
+
+def debug_output_path(mode):
+    """
+    Where a debug-mode request's annotated image goes: the plain file name
+    output_name under the session's debug directory. None outside debug mode.
+    """
+    name = request.form.get('output_name')
+    if mode != 'debug' or not name:
+        return None
+    return debug_images.path(name, request_session_id())
+
+def load_upload(file):
+    with metrics.stage('decode'):
+        image = cv2.imdecode(np.frombuffer(file.read(), np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image")
+    return image
+
+def read_image():
+    if 'image' not in request.files:
+        return None, (jsonify({"success": False, "message": "No file uploaded"}), 400)
+    try:
+        return load_upload(request.files['image']), None
+    except ValueError as e:
+        return None, (jsonify({"success": False, "message": str(e)}), 400)
+
+def challenge_response(mode, passed, face_detected, result):
+    body = {"success": passed, "face_detected": face_detected}
+    if mode != 'verdict':
+        body["result"] = result
+    return jsonify(body)
+
+@app.route('/detect-face', methods=['POST'])
+def detect_face():
+    """Detect faces in an uploaded image. In debug mode output_name receives the annotated image."""
+    image, error = read_image()
+    if error:
+        return error
+
+    try:
+        mode = request_output_mode()
+        output_path = debug_output_path(mode)
+        with face_models.acquire() as models, metrics.stage('detect'):
+            face_data = detect_faces(models.detector, image, output_path)
+        session_id = request_session_id()
+        if session_id:
+            face_sessions.record(session_id, 'initial', bool(face_data["faces"]), face_data, image=image)
+        body = {"success": bool(face_data["faces"]), "face_count": len(face_data["faces"])}
+        if mode != 'verdict':
+            body.update(face_data)
+        return jsonify(body)
+    except PoolBusy as e:
+        return jsonify({"success": False, "error": str(e)}), 503, {"Retry-After": "2"}
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/liveness', methods=['POST'])
+def liveness_all():
+    """Score an uploaded image for every gesture from a single landmark pass."""
+    image, error = read_image()
+    if error:
+        return error
+
+    try:
+        with face_models.acquire() as models, metrics.stage('landmarks'):
+            _, gestures = score_image(models.landmarker, image)
+        return jsonify({"success": gestures is not None, "face_detected": gestures is not None, "gestures": gestures})
+    except PoolBusy as e:
+        return jsonify({"success": False, "error": str(e)}), 503, {"Retry-After": "2"}
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/liveness/<challenge>', methods=['POST'])
+def liveness(challenge):
+    """Run one liveness challenge (blink, turn_head, smile) on an uploaded image."""
+    if challenge not in CHALLENGES:
+        return jsonify({"success": False, "message": f"Unknown challenge: {challenge}"}), 404
+
+    image, error = read_image()
+    if error:
+        return error
+
+    try:
+        mode = request_output_mode()
+        session_id = request_session_id()
+        with face_models.acquire() as models, metrics.stage('landmarks'):
+            passed, result = run_challenge(
+                models.landmarker, challenge, image,
+                output_path=debug_output_path(mode),
+                session_id=session_id,
+                sessions=face_sessions if session_id else None
+            )
+        return challenge_response(mode, passed, result is not None, result)
+    except PoolBusy as e:
+        return jsonify({"success": False, "error": str(e)}), 503, {"Retry-After": "2"}
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+def iter_burst_frames(files, interval_ms):
+    # Decoded lazily so an early exit skips the remaining frames
+    for index, file in enumerate(files[:MAX_STREAM_FRAMES]):
+        yield index * interval_ms, load_upload(file)
+
+@app.route('/liveness/<challenge>/stream', methods=['POST'])
+def liveness_stream(challenge):
+    """
+    Run one liveness challenge over a burst of frames (several 'frames'
+    files, interval_ms apart) or a 'video' clip, tracking the face across
+    frames and stopping at the first frame where the gesture happens.
+    """
+    if challenge not in CHALLENGES:
+        return jsonify({"success": False, "message": f"Unknown challenge: {challenge}"}), 404
+
+    frames = request.files.getlist('frames')
+    video = request.files.get('video')
+    if not frames and video is None:
+        return jsonify({"success": False, "message": "No frames or video uploaded"}), 400
+
+    video_path = None
+    frame_iter = None
+    try:
+        if video is not None:
+            # OpenCV only reads videos from a file
+            fd, video_path = tempfile.mkstemp(suffix=os.path.splitext(video.filename or '')[1])
+            with os.fdopen(fd, 'wb') as f:
+                video.save(f)
+            frame_iter = iter_video_frames(video_path, MAX_STREAM_FRAMES)
+        else:
+            frame_iter = iter_burst_frames(frames, float(request.form.get('interval_ms', 100)))
+
+        mode = request_output_mode()
+        with face_models.acquire() as models, metrics.stage('stream'):
+            passed, result = run_stream(models.tracker, challenge, frame_iter)
+        session_id = request_session_id()
+        if session_id:
+            face_sessions.record(session_id, challenge, passed, result)
+        return challenge_response(mode, passed, result["face_frames"] > 0, result)
+    except PoolBusy as e:
+        return jsonify({"success": False, "error": str(e)}), 503, {"Retry-After": "2"}
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+    finally:
+        if frame_iter is not None:
+            frame_iter.close()  # Releases the video capture before the file is removed
+        if video_path:
+            os.remove(video_path)
+
+@app.route('/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    """Per-step verdicts and results recorded for a session."""
+    session = face_sessions.get(session_id)
+    if session is None:
+        return jsonify({"success": False, "message": "Unknown or expired session"}), 404
+    return jsonify({"success": True, **session.summary()})
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def drop_session(session_id):
+    """Release a session's frames and debug images once its verdict has been persisted."""
+    debug_images.drop(session_id)
+    return jsonify({"success": face_sessions.drop(session_id) is not None})
+
+@app.route('/health', methods=['GET'])
+def health():
+    status = face_models.health()
+    status["sessions"] = face_sessions.stats()
+    return jsonify(status), 200 if status["healthy"] else 503
+
+if __name__ == '__main__':
+    # Load the models before accepting requests
+    face_models.start()
+    app.run(host='127.0.0.1', port=5002, threaded=True)
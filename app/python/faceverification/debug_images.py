@@ -0,0 +1,58 @@
+import os
+import shutil
+import time
+
+
+def _path_component(value):
+    if not value or value in ('.', '..') or '/' in value or '\\' in value or '\0' in value:
+        raise ValueError(f"Invalid debug output name: {value!r}")
+    return value
+
+
+class DebugImageStore:
+    """
+    Annotated debug-mode images, written only below root/<session_id>.
+
+    A session's images are removed with drop(session_id), or by
+    purge_expired() once nothing in them has changed for ttl seconds.
+    """
+
+    def __init__(self, root, ttl=3600):
+        self.root = os.path.realpath(root)
+        self.ttl = ttl
+
+    def path(self, name, session_id=None):
+        """Return the path for the plain file name under the session's directory, creating it."""
+        parts = [_path_component(name)]
+        if session_id:
+            parts.insert(0, _path_component(session_id))
+
+        path = os.path.realpath(os.path.join(self.root, *parts))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Invalid debug output name: {name!r}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def drop(self, session_id):
+        try:
+            directory = os.path.join(self.root, _path_component(session_id))
+        except ValueError:
+            return
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def purge_expired(self):
+        if not os.path.isdir(self.root):
+            return
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(self.root):
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    # Images are overwritten in place, which leaves the directory's own mtime alone
+                    newest = max([entry.stat().st_mtime] + [f.stat().st_mtime for f in os.scandir(entry.path)])
+                    if newest < cutoff:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                elif entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                # Written to or removed concurrently; the next purge retries
+                continue
@@ -0,0 +1,126 @@
+import os
+
+import cv2
+
+# Longest image side detection runs at; boxes are mapped back to the original
+DETECT_MAX_SIDE = 640
+
+BLAZEFACE_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blaze_face_short_range.tflite")
+
+
+class HaarDetector:
+    """OpenCV's frontal-face Haar cascade."""
+
+    name = 'haar'
+
+    def __init__(self):
+        cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        if not os.path.exists(cascade_path):
+            raise FileNotFoundError(f"Haar cascade file not found at {cascade_path}")
+
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise RuntimeError("Failed to load Haar cascade classifier")
+
+    def detect(self, image):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return [tuple(face) for face in self.cascade.detectMultiScale(gray, 1.3, 5)]
+
+    def close(self):
+        pass
+
+
+class MediaPipeDetector:
+    """
+    MediaPipe's BlazeFace short-range detector; needs the model at
+    FACE_BLAZEFACE_MODEL or blaze_face_short_range.tflite next to this file.
+    The heavier FaceLandmarker is loaded only for liveness.
+    """
+
+    name = 'mediapipe'
+
+    def __init__(self, model_path=None, min_confidence=0.5):
+        from mediapipe.tasks import python
+        from mediapipe.tasks.python import vision
+
+        model_path = model_path or os.environ.get('FACE_BLAZEFACE_MODEL') or BLAZEFACE_MODEL_PATH
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"BlazeFace model not found at {model_path}")
+        options = vision.FaceDetectorOptions(
+            base_options=python.BaseOptions(model_asset_path=model_path),
+            min_detection_confidence=min_confidence)
+        self.detector = vision.FaceDetector.create_from_options(options)
+
+    def detect(self, image):
+        import mediapipe as mp
+
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        h, w = image.shape[:2]
+        faces = []
+        for detection in self.detector.detect(mp_image).detections:
+            box = detection.bounding_box
+            x0, y0 = max(box.origin_x, 0), max(box.origin_y, 0)
+            x1, y1 = min(box.origin_x + box.width, w), min(box.origin_y + box.height, h)
+            faces.append((int(x0), int(y0), int(x1 - x0), int(y1 - y0)))
+        return faces
+
+    def close(self):
+        self.detector.close()
+
+
+class YuNetDetector:
+    """OpenCV's YuNet CNN detector; needs the ONNX model at FACE_YUNET_MODEL."""
+
+    name = 'yunet'
+
+    def __init__(self, model_path=None, score_threshold=0.8):
+        model_path = model_path or os.environ.get('FACE_YUNET_MODEL')
+        if not model_path or not os.path.exists(model_path):
+            raise FileNotFoundError(f"YuNet model not found at {model_path}")
+        self.detector = cv2.FaceDetectorYN.create(model_path, "", (320, 320), score_threshold)
+
+    def detect(self, image):
+        h, w = image.shape[:2]
+        self.detector.setInputSize((w, h))
+        _, faces = self.detector.detect(image)
+        if faces is None:
+            return []
+        return [tuple(int(v) for v in face[:4]) for face in faces]
+
+    def close(self):
+        pass
+
+
+DETECTORS = {
+    'haar': HaarDetector,
+    'mediapipe': MediaPipeDetector,
+    'yunet': YuNetDetector,
+}
+
+
+def create_detector(backend=None):
+    """
+    Load a face detector by name, defaulting to FACE_DETECTOR or haar.
+    mediapipe and yunet raise FileNotFoundError when their model is missing.
+    """
+    backend = backend or os.environ.get('FACE_DETECTOR') or 'haar'
+    if backend not in DETECTORS:
+        raise ValueError(f"Unknown face detector: {backend}")
+    return DETECTORS[backend]()
+
+
+def detect_scaled(detector, image, max_side=DETECT_MAX_SIDE):
+    """
+    Run detector on a copy of image shrunk to max_side and return
+    (x, y, w, h) boxes in the original image's coordinates.
+    """
+    h, w = image.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1:
+        return detector.detect(image)
+
+    small = cv2.resize(image, (int(round(w * scale)), int(round(h * scale))), interpolation=cv2.INTER_AREA)
+    return [
+        tuple(int(round(v / scale)) for v in face)
+        for face in detector.detect(small)
+    ]
@@ -1,10 +1,47 @@
 import sys
 import cv2
-import numpy as np
 import json
 import os
 import datetime
 
+if not __package__:
+    # Run as a script: make the faceverification package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from faceverification.detectors import create_detector, detect_scaled
+
+# verdict: pass/fail only; json: metrics too; debug: also an annotated image
+OUTPUT_MODES = ('verdict', 'json', 'debug')
+
+def output_mode(mode=None, default='debug'):
+    """Resolve an output mode, falling back to FACE_OUTPUT_MODE and then default."""
+    mode = mode or os.environ.get('FACE_OUTPUT_MODE') or default
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f"Unknown output mode: {mode}")
+    return mode
+
+def detect_faces(detector, image, output_path=None):
+    """
+    Detect faces in a BGR image and return the face data dict. Detection
+    runs on a downscaled copy; boxes are in the original image's pixels.
+    With output_path, the image is saved there with the faces outlined.
+    """
+    faces = detect_scaled(detector, image)
+
+    if output_path and len(faces) > 0:
+        debug_image = image.copy()
+        for (x, y, w, h) in faces:
+            cv2.rectangle(debug_image, (x, y), (x+w, y+h), (255, 0, 0), 2)
+        cv2.imwrite(output_path, debug_image)
+
+    return {
+        "faces": [{"x": int(x), "y": int(y), "width": int(w), "height": int(h)} for (x, y, w, h) in faces],
+        "image_width": image.shape[1],
+        "image_height": image.shape[0],
+        "detector": detector.name,
+        "detected_at": str(datetime.datetime.now())
+    }
+
 def detect_face(image_path, output_path):
     try:
         # Ensure output directory exists
@@ -20,40 +57,22 @@ def detect_face(image_path, output_path):
         if image is None:
             raise ValueError(f"Could not load image from path: {image_path}")
 
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # Load face cascade classifier
-        cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        if not os.path.exists(cascade_path):
-            raise FileNotFoundError(f"Haar cascade file not found at {cascade_path}")
-        
-        face_cascade = cv2.CascadeClassifier(cascade_path)
-        if face_cascade.empty():
-            raise RuntimeError("Failed to load Haar cascade classifier")
-
-        # Detect faces
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+        mode = output_mode()
+        detector = create_detector()
+        try:
+            face_data = detect_faces(detector, image, output_path if mode == 'debug' else None)
+        finally:
+            detector.close()
         
-        if len(faces) == 0:
+        if not face_data["faces"]:
             print("[INFO] No faces detected", file=sys.stderr)
             return False
         
-        # Draw rectangles around the faces
-        for (x, y, w, h) in faces:
-            cv2.rectangle(image, (x, y), (x+w, y+h), (255, 0, 0), 2)
-
-        # Save the output image
-        cv2.imwrite(output_path, image)
+        if mode == 'verdict':
+            print(f"[INFO] Face detection successful, {len(face_data['faces'])} face(s) found")
+            return True
         
         # Save face coordinates as JSON
-        face_data = {
-            "faces": [{"x": int(x), "y": int(y), "width": int(w), "height": int(h)} for (x, y, w, h) in faces],
-            "image_width": image.shape[1],
-            "image_height": image.shape[0],
-            "detected_at": str(datetime.datetime.now())
-        }
-        
         json_path = output_path + ".json"
         with open(json_path, "w") as f:
             json.dump(face_data, f)
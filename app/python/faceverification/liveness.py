@@ -0,0 +1,344 @@
+import datetime
+import json
+import os
+
+import cv2
+import numpy as np
+import mediapipe as mp
+from mediapipe.tasks import python
+from mediapipe.tasks.python import vision
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "face_landmarker.task")
+
+# Blink: eye aspect ratio over six landmarks per eye
+LEFT_EYE_INDICES = [33, 160, 158, 133, 153, 144]
+RIGHT_EYE_INDICES = [362, 385, 387, 263, 373, 380]
+EAR_THRESHOLD = 0.25
+
+# Smile: mouth width against the gap between the lips
+UPPER_LIP_INDICES = [13, 14, 312]
+LOWER_LIP_INDICES = [17, 16, 15]
+MOUTH_CORNERS = [61, 291]
+SMILE_THRESHOLD = 0.3
+# In a stream, a smile must also widen the mouth ratio this much over its narrowest frame
+SMILE_RISE = 1.2
+
+# Head turn: nose tip offset from the centre of the eyes
+NOSE_TIP = 1
+LEFT_EYE_OUTER = 33
+RIGHT_EYE_OUTER = 263
+FOREHEAD = 10
+CHIN = 152
+YAW_THRESHOLD = 0.15
+
+# Only these landmarks are read out of MediaPipe's 478; metrics work on a
+# compact float32 array of them in this order
+LANDMARK_INDICES = sorted(set(
+    LEFT_EYE_INDICES + RIGHT_EYE_INDICES + UPPER_LIP_INDICES + LOWER_LIP_INDICES
+    + MOUTH_CORNERS + [NOSE_TIP, LEFT_EYE_OUTER, RIGHT_EYE_OUTER, FOREHEAD, CHIN]
+))
+_POS = {idx: pos for pos, idx in enumerate(LANDMARK_INDICES)}
+_EYES = np.array([[_POS[i] for i in LEFT_EYE_INDICES], [_POS[i] for i in RIGHT_EYE_INDICES]])
+_UPPER_LIP = np.array([_POS[i] for i in UPPER_LIP_INDICES])
+_LOWER_LIP = np.array([_POS[i] for i in LOWER_LIP_INDICES])
+_CORNERS = np.array([_POS[i] for i in MOUTH_CORNERS])
+
+
+def create_landmarker(num_faces=1):
+    """Load face_landmarker.task into a single-image FaceLandmarker."""
+    options = vision.FaceLandmarkerOptions(
+        base_options=python.BaseOptions(model_asset_path=MODEL_PATH),
+        num_faces=num_faces,
+        min_face_detection_confidence=0.5)
+    return vision.FaceLandmarker.create_from_options(options)
+
+
+def create_video_landmarker():
+    """Load face_landmarker.task into a FaceLandmarker that tracks a face across frames."""
+    options = vision.FaceLandmarkerOptions(
+        base_options=python.BaseOptions(model_asset_path=MODEL_PATH),
+        running_mode=vision.RunningMode.VIDEO,
+        num_faces=1,
+        min_face_detection_confidence=0.5,
+        min_tracking_confidence=0.5)
+    return vision.FaceLandmarker.create_from_options(options)
+
+
+class TrackingLandmarker:
+    """
+    A VIDEO-mode FaceLandmarker reused for one stream after another.
+
+    MediaPipe requires timestamps to keep increasing for the lifetime of the
+    landmarker, so each stream's frame times are shifted past the previous
+    stream's last frame.
+    """
+
+    # Gap left between streams so tracking does not carry over
+    STREAM_GAP_MS = 1000
+
+    def __init__(self):
+        self.landmarker = create_video_landmarker()
+        self._last_ms = 0
+        self._offset_ms = 0
+
+    def start_stream(self):
+        self._offset_ms = self._last_ms + self.STREAM_GAP_MS
+
+    def detect(self, image, timestamp_ms):
+        timestamp_ms = max(self._offset_ms + int(timestamp_ms), self._last_ms + 1)
+        self._last_ms = timestamp_ms
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        return _pixel_landmarks(self.landmarker.detect_for_video(mp_image, timestamp_ms), image)
+
+    def close(self):
+        self.landmarker.close()
+
+
+def _pixel_landmarks(results, image):
+    if not results.face_landmarks:
+        return None
+
+    face = results.face_landmarks[0]
+    h, w = image.shape[:2]
+    points = np.array([(face[idx].x, face[idx].y) for idx in LANDMARK_INDICES], dtype=np.float32)
+    return points * np.array([w, h], dtype=np.float32)
+
+
+def detect_landmarks(landmarker, image):
+    """Pixel coordinates of the first face's LANDMARK_INDICES in a BGR image, or None."""
+    mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    return _pixel_landmarks(landmarker.detect(mp_image), image)
+
+
+def _distance(a, b):
+    return np.sqrt(np.sum((a - b) ** 2, axis=-1))
+
+
+def gesture_metrics(points):
+    """
+    Raw gesture metrics from compact landmark arrays.
+
+    points has shape (..., len(LANDMARK_INDICES), 2): one frame or a stack
+    of frames. Returns arrays of the leading shape for the eye aspect ratio
+    (averaged over both eyes), mouth ratio, nose offset and left/right
+    ratio.
+    """
+    eyes = points[..., _EYES, :]
+    horizontal = _distance(eyes[..., 0, :], eyes[..., 3, :])
+    vertical = _distance(eyes[..., 1, :], eyes[..., 5, :]) + _distance(eyes[..., 2, :], eyes[..., 4, :])
+    ear = np.mean(vertical / (2.0 * horizontal), axis=-1)
+
+    corners = points[..., _CORNERS, :]
+    mouth_width = _distance(corners[..., 0, :], corners[..., 1, :])
+    mouth_height = _distance(points[..., _UPPER_LIP, :].mean(axis=-2), points[..., _LOWER_LIP, :].mean(axis=-2))
+    mouth_ratio = mouth_width / (mouth_height + 1e-5)  # Avoid division by zero
+
+    # In a frontal view the nose sits midway between the eyes
+    nose = points[..., _POS[NOSE_TIP], :]
+    left_eye = points[..., _POS[LEFT_EYE_OUTER], :]
+    right_eye = points[..., _POS[RIGHT_EYE_OUTER], :]
+    eye_center = (left_eye + right_eye) / 2
+    nose_offset = (nose[..., 0] - eye_center[..., 0]) / _distance(right_eye, left_eye)
+    lr_ratio = _distance(nose, left_eye) / (_distance(nose, right_eye) + 1e-5)
+
+    return {"ear": ear, "mouth_ratio": mouth_ratio, "nose_offset": nose_offset, "lr_ratio": lr_ratio}
+
+
+def blink_result(metrics):
+    avg_ear = float(metrics["ear"])
+    blink_detected = avg_ear < EAR_THRESHOLD
+
+    confidence = 1.0 - (avg_ear / 0.3) if blink_detected else avg_ear / 0.3
+    return {
+        "blink_detected": blink_detected,
+        "confidence": max(0.0, min(1.0, confidence)),
+        "ear_value": avg_ear,
+    }
+
+
+def smile_result(metrics):
+    mouth_ratio = float(metrics["mouth_ratio"])
+    smile_detected = mouth_ratio > SMILE_THRESHOLD
+
+    confidence = (mouth_ratio / SMILE_THRESHOLD) - 0.5 if smile_detected else 0.5 - (mouth_ratio / SMILE_THRESHOLD)
+    return {
+        "smile_detected": smile_detected,
+        "confidence": max(0.0, min(1.0, confidence)),
+        "mouth_ratio": mouth_ratio,
+    }
+
+
+def head_turn_result(metrics):
+    nose_offset_x = float(metrics["nose_offset"])
+
+    turn_detected = abs(nose_offset_x) > YAW_THRESHOLD
+    confidence = min(abs(nose_offset_x) / YAW_THRESHOLD, 1.0) if turn_detected else 0.5
+    return {
+        "head_turn_detected": turn_detected,
+        # Positive offsets are a right turn, negative a left turn
+        "turn_direction": "right" if nose_offset_x > 0 else "left",
+        "yaw_angle": nose_offset_x * 45,  # Rough approximation in degrees
+        "lr_ratio": float(metrics["lr_ratio"]),
+        "confidence": confidence,
+    }
+
+
+def _point(landmarks, idx):
+    x, y = landmarks[_POS[idx]]
+    return int(x), int(y)
+
+
+def _draw_points(image, landmarks, indices, radius=2):
+    for idx in indices:
+        cv2.circle(image, _point(landmarks, idx), radius, (0, 255, 0), -1)
+
+
+def draw_blink(image, landmarks):
+    _draw_points(image, landmarks, LEFT_EYE_INDICES + RIGHT_EYE_INDICES)
+
+
+def draw_smile(image, landmarks):
+    _draw_points(image, landmarks, UPPER_LIP_INDICES + LOWER_LIP_INDICES + MOUTH_CORNERS)
+
+
+def draw_head_turn(image, landmarks):
+    _draw_points(image, landmarks, [NOSE_TIP, LEFT_EYE_OUTER, RIGHT_EYE_OUTER, FOREHEAD, CHIN], radius=3)
+    eye_center = (landmarks[_POS[LEFT_EYE_OUTER]] + landmarks[_POS[RIGHT_EYE_OUTER]]) / 2
+    cv2.line(image, (int(eye_center[0]), int(eye_center[1])), _point(landmarks, NOSE_TIP), (0, 0, 255), 2)
+
+
+# challenge -> (result from gesture_metrics, debug drawing, result file prefix, verdict key)
+CHALLENGES = {
+    "blink": (blink_result, draw_blink, "blink", "blink_detected"),
+    "smile": (smile_result, draw_smile, "smile", "smile_detected"),
+    "turn_head": (head_turn_result, draw_head_turn, "head_turn", "head_turn_detected"),
+}
+
+
+def compute_metrics(landmarks):
+    """Score one face's landmarks for every gesture: {challenge: result}."""
+    metrics = gesture_metrics(landmarks)
+    return {challenge: result(metrics) for challenge, (result, _, _, _) in CHALLENGES.items()}
+
+
+def score_image(landmarker, image):
+    """
+    Run the landmarker once on a BGR image and score every gesture.
+
+    Returns (landmarks, metrics), or (None, None) when no face was found.
+    """
+    landmarks = detect_landmarks(landmarker, image)
+    if landmarks is None:
+        return None, None
+    return landmarks, compute_metrics(landmarks)
+
+
+def run_challenge(landmarker, challenge, image, output_path=None, result_dir=None, session_id=None,
+                  sessions=None):
+    """
+    Evaluate one liveness challenge on a BGR image.
+
+    Returns (passed, result); result is None when no face was found. The
+    result holds the challenge's own metrics plus, under "gestures", the
+    metrics of every gesture from the same landmark pass. With output_path
+    the annotated image is written there, and with result_dir the result is
+    saved as <prefix>_result_<session_id>.json. With a SessionStore in
+    sessions, the frame, landmarks and result are kept in memory instead.
+    """
+    _, draw, prefix, verdict = CHALLENGES[challenge]
+    landmarks, metrics = score_image(landmarker, image)
+    if landmarks is None:
+        if sessions is not None:
+            sessions.record(session_id, challenge, False, None, image=image)
+        return False, None
+
+    result = dict(metrics[challenge])
+    result["gestures"] = metrics
+    result["detected_at"] = str(datetime.datetime.now())
+
+    if output_path:
+        debug_image = image.copy()
+        draw(debug_image, landmarks)
+        cv2.imwrite(output_path, debug_image)
+    if result_dir:
+        with open(os.path.join(result_dir, f"{prefix}_result_{session_id}.json"), "w") as f:
+            json.dump(result, f)
+    if sessions is not None:
+        sessions.record(session_id, challenge, result[verdict], result, image=image, landmarks=landmarks)
+    return result[verdict], result
+
+
+class GestureEvent:
+    """
+    Detects a challenge's gesture as a transition across frames: eyes seen
+    open and then closed, a frontal face that then turns, or a mouth ratio
+    that rises SMILE_RISE above its narrowest frame while smiling.
+    """
+
+    def __init__(self, challenge):
+        self.challenge = challenge
+        self._verdict = CHALLENGES[challenge][3]
+        self._neutral_seen = False
+        self._min_ratio = None
+
+    def update(self, metrics):
+        """Feed one frame's metrics for the challenge; True once the gesture happened."""
+        if self.challenge == "smile":
+            ratio = metrics["mouth_ratio"]
+            detected = (self._min_ratio is not None and metrics[self._verdict]
+                        and ratio >= self._min_ratio * SMILE_RISE)
+            self._min_ratio = ratio if self._min_ratio is None else min(self._min_ratio, ratio)
+            return bool(detected)
+
+        if not metrics[self._verdict]:
+            self._neutral_seen = True
+            return False
+        return self._neutral_seen
+
+
+def iter_video_frames(path, max_frames=None):
+    """Yield (timestamp_ms, BGR frame) from a video file."""
+    capture = cv2.VideoCapture(path)
+    try:
+        count = 0
+        while max_frames is None or count < max_frames:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield capture.get(cv2.CAP_PROP_POS_MSEC), frame
+            count += 1
+    finally:
+        capture.release()
+
+
+def run_stream(tracker, challenge, frames):
+    """
+    Track a face through (timestamp_ms, BGR image) frames until the
+    challenge's gesture happens, reading no further frames once it has.
+
+    Returns (passed, result). The result holds the challenge metrics of the
+    frame the gesture was detected on (or of the last face frame), with
+    frame counts and the event frame's index and timestamp.
+    """
+    tracker.start_stream()
+    event = GestureEvent(challenge)
+    result = {"frames_processed": 0, "face_frames": 0, "event_frame": None, "event_ms": None}
+    passed = False
+
+    for index, (timestamp_ms, image) in enumerate(frames):
+        result["frames_processed"] += 1
+        landmarks = tracker.detect(image, timestamp_ms)
+        if landmarks is None:
+            continue
+
+        result["face_frames"] += 1
+        metrics = CHALLENGES[challenge][0](gesture_metrics(landmarks))
+        result.update(metrics)
+        if event.update(metrics):
+            passed = True
+            result["event_frame"] = index
+            result["event_ms"] = float(timestamp_ms)
+            break
+
+    result["detected_at"] = str(datetime.datetime.now())
+    return passed, result
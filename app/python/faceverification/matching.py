@@ -0,0 +1,68 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from faceverification.liveness import create_landmarker
+
+# Cosine similarity above which SFace embeddings are the same person
+MATCH_THRESHOLD = 0.363
+
+# MediaPipe landmarks forming SFace's five alignment points, in its order:
+# right eye, left eye, nose tip, right and left mouth corner
+_ALIGNMENT_POINTS = [[33, 133], [362, 263], [1], [61], [291]]
+
+
+class FaceEmbedder:
+    """
+    SFace face embeddings on CPU, aligned with the FaceLandmarker model.
+
+    The SFace ONNX model is read from model_path or FACE_SFACE_MODEL. Calls
+    are serialized, since neither model may be used from two threads at once.
+    """
+
+    def __init__(self, model_path=None):
+        model_path = model_path or os.environ.get('FACE_SFACE_MODEL')
+        if not model_path or not os.path.exists(model_path):
+            raise FileNotFoundError(f"SFace model not found at {model_path}")
+        self.recognizer = cv2.FaceRecognizerSF.create(model_path, "")
+        self.landmarker = create_landmarker()
+        self._lock = threading.Lock()
+
+    def _face_row(self, image):
+        # Bounding box, five landmarks and score in the layout alignCrop expects
+        import mediapipe as mp
+
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        results = self.landmarker.detect(mp_image)
+        if not results.face_landmarks:
+            return None
+
+        face = results.face_landmarks[0]
+        h, w = image.shape[:2]
+        points = np.array([(lm.x * w, lm.y * h) for lm in face], dtype=np.float32)
+        x0, y0 = points.min(axis=0)
+        x1, y1 = points.max(axis=0)
+        landmarks = [points[group].mean(axis=0) for group in _ALIGNMENT_POINTS]
+        return np.array([[x0, y0, x1 - x0, y1 - y0, *np.concatenate(landmarks), 1.0]], dtype=np.float32)
+
+    def embed(self, image):
+        """Unit-length embedding of the main face in a BGR image, or None if there is no face."""
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        with self._lock:
+            row = self._face_row(image)
+            if row is None:
+                return None
+            feature = self.recognizer.feature(self.recognizer.alignCrop(image, row[0]))
+        feature = feature.ravel().astype(np.float32)
+        return feature / np.linalg.norm(feature)
+
+    def close(self):
+        self.landmarker.close()
+
+
+def similarity(a, b):
+    """Cosine similarity of two unit-length embeddings."""
+    return float(np.dot(a, b))
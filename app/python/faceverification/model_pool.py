@@ -0,0 +1,106 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from faceverification.detectors import HaarDetector, create_detector
+from faceverification.liveness import TrackingLandmarker, create_landmarker
+
+logger = logging.getLogger(__name__)
+
+
+class PoolBusy(Exception):
+    """Raised when no face model set frees up in time."""
+
+
+class FaceModels:
+    """
+    A still-image FaceLandmarker, a tracking one for bursts and videos, and
+    a face detector; none of them may be shared between threads.
+
+    The detector is only needed by face detection, so it is loaded on first
+    use. A backend whose model file is missing falls back to Haar.
+    """
+
+    def __init__(self, detector=None):
+        self.landmarker = create_landmarker()
+        self.tracker = TrackingLandmarker()
+        self.detector_backend = detector
+        self._detector = None
+
+    @property
+    def detector(self):
+        if self._detector is None:
+            try:
+                self._detector = create_detector(self.detector_backend)
+            except FileNotFoundError as e:
+                logger.warning("%s; falling back to the Haar face detector", e)
+                self._detector = HaarDetector()
+        return self._detector
+
+    def close(self):
+        self.landmarker.close()
+        self.tracker.close()
+        if self._detector is not None:
+            self._detector.close()
+
+
+class FaceModelPool:
+    """
+    Fixed set of loaded FaceModels handed out to one request at a time.
+
+    Models are loaded once by start() and reused for every request; a
+    request that waits longer than acquire_timeout for a free set raises
+    PoolBusy. on_stage, when given, is called as on_stage('pool_wait',
+    seconds) with how long each request waited for a set.
+    """
+
+    def __init__(self, workers=2, acquire_timeout=30, detector=None, on_stage=None):
+        self.size = workers
+        self.detector = detector
+        self.acquire_timeout = acquire_timeout
+        self.on_stage = on_stage
+        self.load_seconds = None
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            started = time.perf_counter()
+            for _ in range(self.size):
+                self._idle.put(FaceModels(self.detector))
+            self.load_seconds = round(time.perf_counter() - started, 3)
+            self._started = True
+
+    @contextmanager
+    def acquire(self):
+        self.start()
+        waited = time.perf_counter()
+        try:
+            models = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise PoolBusy(f"All {self.size} face model workers are busy")
+        if self.on_stage is not None:
+            self.on_stage('pool_wait', time.perf_counter() - waited)
+        try:
+            yield models
+        finally:
+            self._idle.put(models)
+
+    def health(self):
+        return {
+            'healthy': self._started,
+            'workers': self.size,
+            'idle': self._idle.qsize(),
+            'load_seconds': self.load_seconds
+        }
+
+    def shutdown(self):
+        with self._lock:
+            while not self._idle.empty():
+                self._idle.get_nowait().close()
+            self._started = False
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from servicecommon.cache import BoundedCache
+
+
+def _nbytes(array):
+    return array.nbytes if array is not None else 0
+
+
+class FaceSession:
+    """Decoded frames, landmarks and results of one verification session."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.frames = {}     # step -> BGR image
+        self.landmarks = {}  # step -> compact landmark array
+        self.results = {}    # step -> {"passed": bool, "result": dict}
+        self.updated_at = time.time()
+        self.lock = threading.Lock()
+
+    @property
+    def size(self):
+        arrays = list(self.frames.values()) + list(self.landmarks.values())
+        return sum(array.nbytes for array in arrays)
+
+    def summary(self):
+        return {
+            "session_id": self.session_id,
+            "steps": {step: entry["passed"] for step, entry in self.results.items()},
+            "results": {step: entry["result"] for step, entry in self.results.items()},
+            "updated_at": self.updated_at,
+        }
+
+
+class SessionStore:
+    """
+    Bounded in-memory FaceSession store with TTL eviction.
+
+    Each step (initial, blink, turn_head, smile) keeps only its latest
+    frame. Sessions expire ttl seconds after their last update, and the
+    least recently used ones go first once max_sessions or max_bytes is
+    reached. A step that would grow one session past max_bytes is rejected
+    with ValueError. Nothing is written to disk; callers persist the final
+    verdict.
+    """
+
+    def __init__(self, max_sessions=1024, max_bytes=512 * 1024 * 1024, ttl=3600):
+        self._cache = BoundedCache(max_entries=max_sessions, max_bytes=max_bytes, ttl=ttl)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        return self._cache.get(session_id)
+
+    def record(self, session_id, step, passed, result, image=None, landmarks=None):
+        # Get-or-create and put under one lock, so concurrent steps of a new
+        # session cannot each store their own FaceSession
+        with self._lock:
+            session = self._cache.get(session_id) or FaceSession(session_id)
+            with session.lock:
+                size = session.size
+                if image is not None:
+                    size += image.nbytes - _nbytes(session.frames.get(step))
+                if landmarks is not None:
+                    size += landmarks.nbytes - _nbytes(session.landmarks.get(step))
+                if self.max_bytes is not None and size > self.max_bytes:
+                    raise ValueError(
+                        f"Session {session_id} would hold {size} bytes, over the {self.max_bytes} byte limit"
+                    )
+                if image is not None:
+                    session.frames[step] = image
+                if landmarks is not None:
+                    session.landmarks[step] = landmarks
+                session.results[step] = {"passed": bool(passed), "result": result}
+                session.updated_at = time.time()
+            # Re-putting refreshes the session's TTL and byte accounting
+            self._cache.put(session_id, session, size)
+        return session
+
+    def drop(self, session_id):
+        """Forget a session once its verdict has been persisted."""
+        with self._lock:
+            return self._cache.pop(session_id)
+
+    def purge_expired(self):
+        self._cache.purge_expired()
+
+    def stats(self):
+        return self._cache.stats()
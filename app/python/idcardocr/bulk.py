@@ -0,0 +1,110 @@
+import json
+import multiprocessing
+import os
+
+from idcardocr.ingest import prepare_image
+from idcardocr.parsing import parse_ktp_results
+from idcardocr.worker_pool import RECOGNIZER_BATCH_SIZE, _plain_results, load_reader
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+# Set in each worker process by _init_worker
+_reader = None
+_max_side = None
+
+
+def list_images(source):
+    """
+    Image paths from a directory (searched recursively) or a manifest file
+    with one path per line, relative paths resolved against the manifest.
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(
+                os.path.join(root, name) for name in files
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        return sorted(paths)
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding='utf-8') as manifest:
+        return [
+            os.path.join(base, line.strip()) for line in manifest
+            if line.strip() and not line.startswith('#')
+        ]
+
+
+def completed_paths(output_path):
+    """
+    Paths already recorded successfully in a JSONL output. A line cut off
+    by an interrupted run is truncated away so appends start cleanly.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, 'rb+') as output:
+        valid_end = 0
+        for line in output:
+            if not line.endswith(b'\n'):
+                break
+            valid_end += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if 'error' not in record:
+                done.add(record['path'])
+        output.truncate(valid_end)
+    return done
+
+
+def _init_worker(max_side, threads):
+    global _reader, _max_side
+    import torch
+
+    # Workers split the cores between them instead of each using all of them
+    torch.set_num_threads(threads)
+    _reader = load_reader()
+    _max_side = max_side
+
+
+def _process(path):
+    try:
+        with open(path, 'rb') as f:
+            image = prepare_image(f.read(), max_side=_max_side)
+        tokens = _plain_results(_reader.readtext(image, batch_size=RECOGNIZER_BATCH_SIZE))
+        data, confidence = parse_ktp_results(tokens)
+        return {'path': path, 'data': data, 'confidence': confidence, 'tokens': tokens}
+    except Exception as e:
+        return {'path': path, 'error': str(e)}
+
+
+def run_bulk(source, output_path, workers=None, max_side=1280, progress=None):
+    """
+    OCR every card image in source and append one JSON line per image to
+    output_path. Images already in the output are skipped, so an
+    interrupted run can be restarted with the same arguments; images that
+    failed are retried. Returns (processed, skipped, failed) counts.
+    """
+    workers = workers or os.cpu_count() or 1
+    paths = list_images(source)
+    done = completed_paths(output_path)
+    todo = [path for path in paths if path not in done]
+
+    processed = failed = 0
+    if todo:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        # torch is not fork-safe, so workers always start from a fresh interpreter
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(workers, initializer=_init_worker, initargs=(max_side, threads)) as pool, \
+                open(output_path, 'a', encoding='utf-8') as output:
+            for record in pool.imap_unordered(_process, todo, chunksize=4):
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                output.flush()
+                processed += 1
+                failed += 'error' in record
+                if progress:
+                    progress(processed, len(todo), record)
+    return processed, len(paths) - len(todo), failed
@@ -0,0 +1,26 @@
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageOps
+
+
+def prepare_image(data, max_side=1280, grayscale=False):
+    """
+    Decode an uploaded image from memory into an array ready for OCR.
+
+    EXIF orientation is applied, the image is downsampled so its longer
+    side is at most max_side pixels, and it is returned as a BGR array
+    (or a single-channel array when grayscale is set).
+    """
+    with Image.open(BytesIO(data)) as img:
+        # JPEGs can be decoded straight at 1/2, 1/4 or 1/8 scale
+        img.draft('L' if grayscale else 'RGB', (max_side, max_side))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert('L' if grayscale else 'RGB')
+    if max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    array = np.asarray(img)
+    if grayscale:
+        return array
+    return np.ascontiguousarray(array[:, :, ::-1])
@@ -0,0 +1,113 @@
+import cv2
+import numpy as np
+
+# Canonical KTP size after perspective correction (ID-1, 85.6 x 54 mm)
+CARD_WIDTH = 856
+CARD_HEIGHT = 540
+
+# The card must cover at least this share of the photo to be trusted
+MIN_CARD_AREA = 0.2
+
+# Field regions on the canonical card as (x0, y0, x1, y1) fractions. They
+# start right of the printed labels and stop short of the photo.
+FIELD_REGIONS = {
+    'nik': (0.22, 0.15, 0.74, 0.27),
+    'nama': (0.25, 0.26, 0.74, 0.35),
+    'tanggal_lahir': (0.25, 0.33, 0.74, 0.42),
+}
+
+# Holder's photo on the canonical card
+PORTRAIT_REGION = (0.70, 0.18, 0.97, 0.80)
+
+# The NIK is always 16 digits; restricting the decoder avoids O/0 and I/1 swaps
+FIELD_ALLOWLISTS = {
+    'nik': '0123456789',
+}
+
+
+def _order_corners(points):
+    # Top-left, top-right, bottom-right, bottom-left
+    points = points.reshape(4, 2).astype(np.float32)
+    sums = points.sum(axis=1)
+    diffs = np.diff(points, axis=1).ravel()
+    return np.array([
+        points[np.argmin(sums)],
+        points[np.argmin(diffs)],
+        points[np.argmax(sums)],
+        points[np.argmax(diffs)],
+    ], dtype=np.float32)
+
+
+def find_card(image):
+    """Return the four corners of the card in a BGR photo, or None."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    min_area = MIN_CARD_AREA * image.shape[0] * image.shape[1]
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True):
+        if cv2.contourArea(contour) < min_area:
+            break
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(approx) == 4:
+            return _order_corners(approx)
+    return None
+
+
+def normalize_card(image):
+    """
+    Warp the card in a photo to the canonical size. Photos where no card
+    outline is found are assumed to already be cropped to the card.
+    """
+    corners = find_card(image)
+    if corners is None:
+        return cv2.resize(image, (CARD_WIDTH, CARD_HEIGHT), interpolation=cv2.INTER_AREA)
+
+    target = np.array([
+        [0, 0], [CARD_WIDTH - 1, 0],
+        [CARD_WIDTH - 1, CARD_HEIGHT - 1], [0, CARD_HEIGHT - 1]
+    ], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(corners, target)
+    return cv2.warpPerspective(image, matrix, (CARD_WIDTH, CARD_HEIGHT))
+
+
+def field_crops(card):
+    """Cut the configured field regions out of a normalized card."""
+    crops = {}
+    for field, (x0, y0, x1, y1) in FIELD_REGIONS.items():
+        crops[field] = card[
+            int(y0 * CARD_HEIGHT):int(y1 * CARD_HEIGHT),
+            int(x0 * CARD_WIDTH):int(x1 * CARD_WIDTH)
+        ]
+    return crops
+
+
+def portrait_crop(image):
+    """Cut the holder's photo out of a card photo (BGR or grayscale)."""
+    card = normalize_card(image)
+    x0, y0, x1, y1 = PORTRAIT_REGION
+    return card[
+        int(y0 * CARD_HEIGHT):int(y1 * CARD_HEIGHT),
+        int(x0 * CARD_WIDTH):int(x1 * CARD_WIDTH)
+    ]
+
+
+def read_fields(reader, image):
+    """
+    Recognize only the KTP field regions, skipping text detection.
+
+    Returns {field: (text, confidence)}; empty regions give ('', 0.0).
+    """
+    card = normalize_card(image)
+    gray = cv2.cvtColor(card, cv2.COLOR_BGR2GRAY) if card.ndim == 3 else card
+
+    fields = {}
+    for field, crop in field_crops(gray).items():
+        results = reader.recognize(crop, allowlist=FIELD_ALLOWLISTS.get(field))
+        if results:
+            _, text, conf = results[0]
+            fields[field] = (text.strip(), float(conf))
+        else:
+            fields[field] = ('', 0.0)
+    return fields
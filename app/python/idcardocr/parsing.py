@@ -0,0 +1,171 @@
+import re
+from datetime import datetime
+
+NOT_FOUND = "Not found"
+
+NIK_PATTERN = re.compile(r'\b\d{16}\b')
+DATE_PATTERN = re.compile(r'(\d{1,2})[-/\s.](\d{1,2})[-/\s.](\d{2,4})')
+NAME_LABEL_PATTERN = re.compile(r'Nama\s*:')
+UPPERCASE_NAME_PATTERN = re.compile(r'^[A-Z][A-Z\s\.,]+$')
+DOB_LABEL_PATTERN = re.compile(r'lahir|tgl|tanggal', re.IGNORECASE)
+
+# Lines after the NIK in which the name is looked for
+NAME_WINDOW = 4
+
+
+def _empty_result():
+    data = {"NIK": NOT_FOUND, "Nama": NOT_FOUND, "Tanggal Lahir": NOT_FOUND}
+    confidence = {"NIK": 0.0, "Nama": 0.0, "Tanggal Lahir": 0.0}
+    return data, confidence
+
+
+def format_date(match):
+    """Format a DATE_PATTERN match as DD-MM-YYYY, or None if it is not a valid day/month."""
+    day, month, year = match.groups()
+    if not (1 <= int(day) <= 31 and 1 <= int(month) <= 12):
+        return None
+    if len(year) == 2:
+        # Assume 20XX up to the current year, 19XX otherwise
+        current_year = datetime.now().year % 100
+        century = "20" if int(year) <= current_year else "19"
+        year = f"{century}{year}"
+    elif len(year) == 4 and year.startswith("00"):
+        # OCR often reads 2004 as 0004
+        year = "20" + year[2:]
+    return f"{day.zfill(2)}-{month.zfill(2)}-{year}"
+
+
+def group_lines(results):
+    """
+    Merge OCR tokens into text lines, left to right.
+
+    results is EasyOCR output: (bbox, text, confidence) tuples. A token
+    whose vertical centre falls inside the current line's band joins that
+    line. Returns (text, confidence) pairs where confidence is that of the
+    line's weakest token.
+    """
+    tokens = []
+    for bbox, text, conf in results:
+        xs = [point[0] for point in bbox]
+        ys = [point[1] for point in bbox]
+        tokens.append((min(ys), max(ys), min(xs), text.strip(), float(conf)))
+    tokens.sort()
+
+    lines = []
+    bottom = None
+    for top, token_bottom, left, text, conf in tokens:
+        if not lines or (top + token_bottom) / 2 > bottom:
+            lines.append([])
+            bottom = token_bottom
+        lines[-1].append((left, text, conf))
+
+    merged = []
+    for line in lines:
+        line.sort()
+        merged.append((" ".join(text for _, text, _ in line), min(conf for _, _, conf in line)))
+    return merged
+
+
+def parse_ktp_lines(lines):
+    """
+    Extract NIK, name and birth date from (text, confidence) lines in one pass.
+
+    Returns (data, confidence) dicts keyed by "NIK", "Nama" and
+    "Tanggal Lahir"; fields that were not found hold NOT_FOUND and 0.0.
+    """
+    data, confidence = _empty_result()
+
+    nik_idx = None
+    nik_pending = False   # "NIK" label seen without the number
+    name_pending = False  # bare "Nama" label seen
+    dob_pending = False   # birth date label seen without a date
+    fallback_date = None
+
+    for i, (text, conf) in enumerate(lines):
+        line = text.strip()
+
+        # NIK: the labelled line or the one after it, else the first 16-digit number
+        if data["NIK"] == NOT_FOUND:
+            nik_match = NIK_PATTERN.search(line)
+            if nik_match:
+                data["NIK"], confidence["NIK"] = nik_match.group(0), conf
+                nik_idx = i
+                nik_pending = False
+                continue
+            if nik_pending:
+                # Labelled but no number next to it; search on from the label
+                nik_pending = False
+            elif nik_idx is None and "NIK" in line:
+                nik_idx = i
+                nik_pending = True
+                continue
+        if nik_idx is None or i == nik_idx:
+            continue
+
+        # Name: within NAME_WINDOW lines after the NIK
+        if data["Nama"] == NOT_FOUND and (name_pending or i <= nik_idx + NAME_WINDOW):
+            if name_pending:
+                data["Nama"], confidence["Nama"] = line, conf
+                name_pending = False
+            elif line == "Nama":
+                name_pending = True
+            elif label := NAME_LABEL_PATTERN.search(line):
+                name = line[label.end():].strip()
+                if name:
+                    data["Nama"], confidence["Nama"] = name, conf
+                else:
+                    name_pending = True
+            elif (UPPERCASE_NAME_PATTERN.match(line) and len(line.split()) >= 2
+                  and len(line) > 5):
+                data["Nama"], confidence["Nama"] = line, conf
+
+        # Birth date: on or right after a date label, else the first valid date
+        if data["Tanggal Lahir"] == NOT_FOUND:
+            labelled = dob_pending or DOB_LABEL_PATTERN.search(line)
+            date_match = DATE_PATTERN.search(line)
+            date = format_date(date_match) if date_match else None
+            if date and labelled:
+                data["Tanggal Lahir"], confidence["Tanggal Lahir"] = date, conf
+                dob_pending = False
+            else:
+                dob_pending = bool(DOB_LABEL_PATTERN.search(line))
+                if date and fallback_date is None:
+                    fallback_date = (date, conf)
+
+    if data["Tanggal Lahir"] == NOT_FOUND and fallback_date is not None:
+        data["Tanggal Lahir"], confidence["Tanggal Lahir"] = fallback_date
+    return data, confidence
+
+
+def parse_ktp_results(results):
+    """Parse EasyOCR (bbox, text, confidence) output of a whole card."""
+    return parse_ktp_lines(group_lines(results))
+
+
+def parse_ktp_text(text):
+    """Parse plain OCR text, one line per OCR token; confidence is unknown (1.0)."""
+    return parse_ktp_lines([(line, 1.0) for line in text.strip().split('\n')])
+
+
+def parse_ktp_fields(fields):
+    """Parse the {field: (text, confidence)} output of layout.read_fields."""
+    data, confidence = _empty_result()
+
+    text, conf = fields['nik']
+    nik_match = NIK_PATTERN.search(text)
+    if nik_match:
+        data["NIK"], confidence["NIK"] = nik_match.group(0), conf
+
+    text, conf = fields['nama']
+    label = NAME_LABEL_PATTERN.search(text)
+    name = (text[label.end():] if label else text).lstrip(':; ').strip()
+    if name:
+        data["Nama"], confidence["Nama"] = name, conf
+
+    # The birth date shares its line with the place of birth: "JAKARTA, 17-08-1990"
+    text, conf = fields['tanggal_lahir']
+    date_match = DATE_PATTERN.search(text)
+    date = format_date(date_match) if date_match else None
+    if date:
+        data["Tanggal Lahir"], confidence["Tanggal Lahir"] = date, conf
+    return data, confidence
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from servicecommon.cache import BoundedCache
+
+
+def image_key(image, mode):
+    """Content hash of a decoded image array plus the OCR mode it was read with."""
+    digest = hashlib.sha256()
+    digest.update(f"{mode}:{image.shape}:{image.dtype}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class _DiskStore:
+    # JSON values in a single-table SQLite file, shared by all request threads
+
+    def __init__(self, path, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_results "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, stored_at FROM ocr_results WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        if self.ttl is not None and time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO ocr_results (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+            self._db.commit()
+
+    def purge_expired(self):
+        if self.ttl is None:
+            return
+        with self._lock:
+            self._db.execute("DELETE FROM ocr_results WHERE stored_at < ?", (time.time() - self.ttl,))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM ocr_results")
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+
+
+class OcrResultCache:
+    """
+    OCR output and parsed KTP fields keyed by the decoded image's hash.
+
+    An in-memory LRU sits in front of an optional SQLite file (path), so
+    results survive restarts. Entries in both tiers expire after ttl
+    seconds. Values must be JSON-serializable.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=32 * 1024 * 1024, ttl=86400, path=None):
+        self._memory = BoundedCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+        self._disk = _DiskStore(path, ttl) if path else None
+        self.disk_hits = 0
+
+    def get(self, key):
+        value = self._memory.get(key)
+        if value is not None or self._disk is None:
+            return value
+
+        value = self._disk.get(key)
+        if value is not None:
+            self.disk_hits += 1
+            self._memory.put(key, value, len(json.dumps(value)))
+        return value
+
+    def put(self, key, value):
+        encoded = json.dumps(value)
+        self._memory.put(key, value, len(encoded))
+        if self._disk is not None:
+            self._disk.put(key, encoded)
+
+    def purge_expired(self):
+        self._memory.purge_expired()
+        if self._disk is not None:
+            self._disk.purge_expired()
+
+    def clear(self):
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self):
+        stats = self._memory.stats()
+        # Memory misses served from disk are hits overall
+        stats["hits"] += self.disk_hits
+        stats["misses"] -= self.disk_hits
+        stats["disk_hits"] = self.disk_hits
+        if self._disk is not None:
+            stats["disk_entries"] = len(self._disk)
+        return stats
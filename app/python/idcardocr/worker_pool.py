@@ -0,0 +1,358 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class PoolBusy(Exception):
+    """Raised when the OCR queue is at its depth limit."""
+
+
+# ====== Worker process ======
+
+# Crops handed to the recognizer per forward pass
+RECOGNIZER_BATCH_SIZE = 16
+
+
+def load_reader():
+    import easyocr
+    return easyocr.Reader(['id'], gpu=False)  # Supports Indonesian
+
+
+def load_image(image):
+    """Decode a path or encoded bytes into a BGR array; arrays pass through."""
+    import cv2
+    import numpy as np
+
+    if isinstance(image, np.ndarray):
+        return image
+    if isinstance(image, (bytes, bytearray)):
+        decoded = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+    else:
+        decoded = cv2.imread(image, cv2.IMREAD_COLOR)
+    if decoded is None:
+        raise ValueError("Could not decode image")
+    return decoded
+
+
+def _pad_to(image, height, width):
+    # Pad on the bottom/right only, so detected boxes keep their coordinates
+    import numpy as np
+
+    if image.shape[0] == height and image.shape[1] == width:
+        return image
+    padded = np.zeros((height, width) + image.shape[2:], dtype=image.dtype)
+    padded[:image.shape[0], :image.shape[1]] = image
+    return padded
+
+
+def _plain_results(results):
+    # EasyOCR returns numpy scalars; convert so results pickle small and
+    # serialize to JSON directly.
+    return [
+        ([[int(x), int(y)] for x, y in bbox], text, float(conf))
+        for bbox, text, conf in results
+    ]
+
+
+def readtext_batch(reader, images):
+    """
+    Run OCR over several decoded images in one detector forward pass.
+
+    Images are padded to a common size for the batched CRAFT detector;
+    recognition then batches the text crops of each image.
+    """
+    if len(images) == 1:
+        return [reader.readtext(images[0], batch_size=RECOGNIZER_BATCH_SIZE)]
+
+    height = max(image.shape[0] for image in images)
+    width = max(image.shape[1] for image in images)
+    padded = [_pad_to(image, height, width) for image in images]
+    return reader.readtext_batched(padded, batch_size=RECOGNIZER_BATCH_SIZE)
+
+
+def _worker_main(worker_id, tasks, results, heartbeat, threads):
+    import torch
+    from idcardocr.layout import read_fields
+
+    # Workers split the cores between them instead of each using all of them
+    torch.set_num_threads(threads)
+    reader = load_reader()
+    results.put(('ready', worker_id, None, None))
+    while True:
+        heartbeat.value = time.time()
+        try:
+            batch = tasks.get(timeout=1)
+        except queue.Empty:
+            continue
+        if batch is None:
+            break
+
+        decoded = []
+        for task_id, image, mode in batch:
+            try:
+                image = load_image(image)
+                if mode == 'fields':
+                    # Field crops skip detection, so they gain nothing from the batch
+                    results.put(('done', worker_id, task_id, read_fields(reader, image)))
+                else:
+                    decoded.append((task_id, image))
+            except Exception as e:
+                results.put(('error', worker_id, task_id, str(e)))
+        if not decoded:
+            continue
+
+        try:
+            batch_results = readtext_batch(reader, [image for _, image in decoded])
+            for (task_id, _), ocr_results in zip(decoded, batch_results):
+                results.put(('done', worker_id, task_id, _plain_results(ocr_results)))
+        except Exception:
+            # Isolate the failing image by retrying one at a time
+            for task_id, image in decoded:
+                try:
+                    ocr_results = reader.readtext(image, batch_size=RECOGNIZER_BATCH_SIZE)
+                    results.put(('done', worker_id, task_id, _plain_results(ocr_results)))
+                except Exception as e:
+                    results.put(('error', worker_id, task_id, str(e)))
+
+
+# ====== Pool ======
+
+class _Worker:
+    def __init__(self, worker_id, context, results, threads):
+        self.id = worker_id
+        self.tasks = context.Queue()
+        self.heartbeat = context.Value('d', time.time())
+        self.process = context.Process(
+            target=_worker_main,
+            args=(worker_id, self.tasks, results, self.heartbeat, threads),
+            daemon=True
+        )
+        self.ready = False
+        self.load_seconds = None
+        self.task_ids = set()
+        self.task_started = None
+        self.started_at = time.time()
+        self.restarts = 0
+
+    def idle(self):
+        return self.ready and not self.task_ids and self.process.is_alive()
+
+
+class OcrWorkerPool:
+    """
+    Pool of OCR worker processes, each loading the EasyOCR Reader once.
+
+    A dispatcher thread hands pending requests to idle, ready workers.
+    Full-card requests go in micro-batches: it waits up to batch_window
+    seconds for up to batch_size of them so the detector sees them in one
+    forward pass. Field requests are sent one per worker without waiting. At
+    most max_queue requests may be waiting or running; beyond that submit()
+    raises PoolBusy. A monitor thread restarts workers that die, stop
+    sending heartbeats, or exceed task_timeout on one batch, failing
+    whatever requests they held.
+
+    Each request's 'queue_wait' before dispatch and 'inference' time in a
+    worker are kept in its Future's timings dict. readtext() and
+    read_fields() pass them to on_stage(stage, seconds), when given, from
+    the calling thread, so a Flask request can add them to its own
+    Server-Timing header.
+    """
+
+    def __init__(self, workers=2, max_queue=32, task_timeout=60, heartbeat_timeout=30, load_timeout=300,
+                 batch_size=4, batch_window=0.05, on_stage=None):
+        self.size = workers
+        self.max_queue = max_queue
+        self.task_timeout = task_timeout
+        self.heartbeat_timeout = heartbeat_timeout
+        self.load_timeout = load_timeout
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self.on_stage = on_stage
+        # torch is not fork-safe, so workers always start from a fresh interpreter
+        self._context = multiprocessing.get_context('spawn')
+        self._results = None
+        self._workers = []
+        self._pending = deque()  # (task_id, image, mode, queued_at)
+        self._futures = {}
+        self._ids = itertools.count()
+        self._lock = threading.Condition()
+        self._started = False
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._results = self._context.Queue()
+            self._workers = [self._spawn(i) for i in range(self.size)]
+            for target in (self._dispatch, self._collect, self._monitor):
+                threading.Thread(target=target, daemon=True).start()
+            self._started = True
+
+    def submit(self, image, mode='full'):
+        """
+        Queue an image (path, encoded bytes or BGR array) and return a Future
+        of its OCR results. mode='full' reads every text region; mode='fields'
+        recognizes only the KTP field regions and resolves to
+        {field: (text, confidence)}.
+        """
+        self.start()
+        future = Future()
+        future.timings = {}
+        with self._lock:
+            if len(self._futures) >= self.max_queue:
+                raise PoolBusy(f"OCR queue is full ({self.max_queue} requests pending)")
+            task_id = next(self._ids)
+            self._futures[task_id] = future
+            self._pending.append((task_id, image, mode, time.monotonic()))
+            self._lock.notify_all()
+        return future
+
+    def readtext(self, image, timeout=None):
+        return self._result(self.submit(image), timeout)
+
+    def read_fields(self, image, timeout=None):
+        return self._result(self.submit(image, mode='fields'), timeout)
+
+    def _result(self, future, timeout):
+        try:
+            return future.result(timeout)
+        finally:
+            if self.on_stage is not None:
+                for stage, seconds in list(future.timings.items()):
+                    self.on_stage(stage, seconds)
+
+    def queue_depth(self):
+        return len(self._futures)
+
+    def health(self):
+        now = time.time()
+        with self._lock:
+            workers = [{
+                'worker': worker.id,
+                'pid': worker.process.pid,
+                'alive': worker.process.is_alive(),
+                'ready': worker.ready,
+                'busy': bool(worker.task_ids),
+                'heartbeat_age': round(now - worker.heartbeat.value, 3),
+                'load_seconds': worker.load_seconds,
+                'restarts': worker.restarts
+            } for worker in self._workers]
+            depth = len(self._futures)
+        return {
+            'healthy': bool(workers) and all(w['alive'] for w in workers),
+            'queue_depth': depth,
+            'max_queue': self.max_queue,
+            'workers': workers
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if not self._started:
+                return
+            for worker in self._workers:
+                worker.tasks.put(None)
+            for worker in self._workers:
+                worker.process.join(timeout=5)
+
+    def _spawn(self, worker_id):
+        threads = max(1, (os.cpu_count() or 1) // self.size)
+        worker = _Worker(worker_id, self._context, self._results, threads)
+        worker.process.start()
+        return worker
+
+    def _dispatch(self):
+        with self._lock:
+            while True:
+                worker = next((w for w in self._workers if w.idle()), None)
+                if worker is None or not self._pending:
+                    self._lock.wait(1)
+                    continue
+
+                # Field crops skip detection and gain nothing from a batch, so
+                # each goes straight to its own idle worker
+                fields = next((task for task in self._pending if task[2] == 'fields'), None)
+                if fields is not None:
+                    self._pending.remove(fields)
+                    self._send(worker, [fields])
+                    continue
+
+                # Give concurrent full-card requests a short window to join the batch
+                if len(self._pending) < self.batch_size:
+                    remaining = self.batch_window - (time.monotonic() - self._pending[0][3])
+                    if remaining > 0:
+                        self._lock.wait(remaining)
+                        continue
+
+                count = min(self.batch_size, len(self._pending))
+                self._send(worker, [self._pending.popleft() for _ in range(count)])
+
+    def _send(self, worker, tasks):
+        # Called with the lock held
+        batch = [task[:3] for task in tasks]
+        worker.task_ids = {task[0] for task in batch}
+        worker.task_started = time.time()
+        worker.tasks.put(batch)
+        now = time.monotonic()
+        for task in tasks:
+            future = self._futures.get(task[0])
+            if future is not None:
+                future.timings['queue_wait'] = now - task[3]
+
+    def _collect(self):
+        while True:
+            kind, worker_id, task_id, payload = self._results.get()
+            elapsed = None
+            with self._lock:
+                worker = self._workers[worker_id]
+                if kind == 'ready':
+                    worker.ready = True
+                    worker.load_seconds = round(time.time() - worker.started_at, 3)
+                else:
+                    worker.task_ids.discard(task_id)
+                    if worker.task_started is not None:
+                        elapsed = time.time() - worker.task_started
+                self._lock.notify_all()
+                future = self._futures.pop(task_id, None)
+            if future is None:
+                continue
+            if elapsed is not None:
+                future.timings['inference'] = elapsed
+            if kind == 'done':
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def _monitor(self):
+        while True:
+            time.sleep(1)
+            now = time.time()
+            with self._lock:
+                for worker in list(self._workers):
+                    if not worker.ready:
+                        unhealthy = now - worker.started_at > self.load_timeout
+                    elif worker.task_ids:
+                        unhealthy = now - worker.task_started > self.task_timeout
+                    else:
+                        unhealthy = now - worker.heartbeat.value > self.heartbeat_timeout
+                    if worker.process.is_alive() and not unhealthy:
+                        continue
+                    self._replace(worker)
+                self._lock.notify_all()
+
+    def _replace(self, worker):
+        # Called with the lock held
+        if worker.process.is_alive():
+            worker.process.terminate()
+        worker.process.join(timeout=5)
+        for task_id in worker.task_ids:
+            future = self._futures.pop(task_id, None)
+            if future is not None:
+                future.set_exception(RuntimeError(f"OCR worker {worker.id} failed while processing the request"))
+        replacement = self._spawn(worker.id)
+        replacement.restarts = worker.restarts + 1
+        self._workers[worker.id] = replacement
@@ -1,103 +1,139 @@
 from flask import Flask, request, jsonify
-import easyocr
 import os
-import re
-from datetime import datetime
+import secrets
+import threading
+import time
+
+from idcardocr.ingest import prepare_image
+from idcardocr.layout import portrait_crop
+from idcardocr.parsing import NOT_FOUND, parse_ktp_fields, parse_ktp_results
+from idcardocr.result_cache import OcrResultCache, image_key
+from idcardocr.worker_pool import OcrWorkerPool, PoolBusy
+from servicecommon.cache import BoundedCache, purge_periodically
+from servicecommon.metrics import ServiceMetrics
 
 app = Flask(__name__)
-reader = easyocr.Reader(['id'])  # Supports Indonesian
 
-UPLOAD_FOLDER = 'C:\\Laravel\\Certificate-Issuance\\storage\\app\\private\\temp_id_cards'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Request counts and per-stage timings on GET /metrics
+metrics = ServiceMetrics('ocr')
+metrics.instrument(app)
 
-# Step 1: Perform OCR
-def perform_ocr(image_path):
-    results = reader.readtext(image_path)
-    extracted_text = "\n".join([text[1] for text in results])
-    return extracted_text
-
-# Step 2: Extract KTP Info
-def extract_ktp_info(text):
-    lines = text.strip().split('\n')
-    data = {
-        "NIK": "Not found",
-        "Nama": "Not found",
-        "Tanggal Lahir": "Not found"
+# Pre-warmed OCR worker processes, each holding its own EasyOCR Reader
+ocr_pool = OcrWorkerPool(
+    workers=int(os.environ.get('OCR_WORKERS', os.cpu_count() or 2)),
+    max_queue=int(os.environ.get('OCR_MAX_QUEUE', 32)),
+    task_timeout=float(os.environ.get('OCR_TASK_TIMEOUT', 60)),
+    batch_size=int(os.environ.get('OCR_BATCH_SIZE', 4)),
+    batch_window=float(os.environ.get('OCR_BATCH_WINDOW', 0.05)),
+    on_stage=metrics.observe_stage
+)
+
+# 'fields' recognizes only the NIK, name and birth date regions of the card;
+# 'full' reads every text region and parses the joined lines
+OCR_MODE = os.environ.get('OCR_MODE', 'fields')
+
+# Uploads are decoded in memory and shrunk to this longer side before OCR
+OCR_MAX_SIDE = int(os.environ.get('OCR_MAX_SIDE', 1280))
+OCR_GRAYSCALE = os.environ.get('OCR_GRAYSCALE', '0') == '1'
+
+# Selfie-to-KTP face matching runs here, next to the decoded card, when an
+# SFace model is configured. Each KTP embedding is kept under a random id
+# that /extract-ktp returns and /match-face takes back.
+FACE_SFACE_MODEL = os.environ.get('FACE_SFACE_MODEL')
+_face_embedder = None
+_face_embedder_lock = threading.Lock()
+
+# Opened by start() in the serving process only: with the spawn context every
+# OCR worker re-imports this module, and must not open the SQLite file or run
+# a purge thread of its own
+ocr_cache = None
+face_embeddings = None
+_start_lock = threading.Lock()
+
+@app.before_request
+def start():
+    """Open the result caches and start their purge timer, once."""
+    global ocr_cache, face_embeddings
+    with _start_lock:
+        if ocr_cache is not None:
+            return
+        # Re-uploads of the same card are answered from here instead of re-running OCR.
+        # Set OCR_CACHE_PATH to an SQLite file to keep results across restarts.
+        ocr_cache = OcrResultCache(
+            max_entries=int(os.environ.get('OCR_CACHE_ENTRIES', 1024)),
+            max_bytes=int(os.environ.get('OCR_CACHE_BYTES', 32 * 1024 * 1024)),
+            ttl=float(os.environ.get('OCR_CACHE_TTL', 86400)),
+            path=os.environ.get('OCR_CACHE_PATH') or None
+        )
+        face_embeddings = BoundedCache(
+            max_entries=int(os.environ.get('FACE_EMBEDDING_ENTRIES', 4096)),
+            ttl=float(os.environ.get('FACE_EMBEDDING_TTL', 3600))
+        )
+        # Expired rows are skipped on read but only deleted by a purge, so run one
+        # regularly to keep the SQLite file (and the embeddings) from growing unbounded
+        purge_periodically(float(os.environ.get('OCR_CACHE_PURGE_INTERVAL', 300)), ocr_cache, face_embeddings)
+
+def worker_load_seconds():
+    return {
+        (('model', 'easyocr'), ('worker', w['worker'])): w['load_seconds']
+        for w in ocr_pool.health()['workers'] if w['load_seconds'] is not None
     }
 
-    nik_pattern = re.compile(r'\b\d{16}\b')
-    date_pattern = re.compile(r'(\d{1,2})[-/\s.](\d{1,2})[-/\s.](\d{2,4})')
-    
-    nik_line_idx = None
-
-    # Find NIK
-    for i, line in enumerate(lines):
-        if "NIK" in line:
-            nik_line_idx = i
-            nik_match = nik_pattern.search(line) or (i + 1 < len(lines) and nik_pattern.search(lines[i + 1]))
-            if nik_match:
-                data["NIK"] = nik_match.group(0)
-                nik_line_idx = i + 1 if nik_pattern.search(lines[i + 1]) else i
-            break
-
-    if data["NIK"] == "Not found":
-        for i, line in enumerate(lines):
-            nik_match = nik_pattern.search(line)
-            if nik_match:
-                data["NIK"] = nik_match.group(0)
-                nik_line_idx = i
-                break
-
-    # Find Name
-    if nik_line_idx is not None:
-        for i in range(nik_line_idx + 1, min(nik_line_idx + 5, len(lines))):
-            line = lines[i].strip()
-            if line == "Nama" and i + 1 < len(lines):
-                data["Nama"] = lines[i + 1].strip()
-                break
-            elif "Nama:" in line or "Nama :" in line:
-                data["Nama"] = re.sub(r'Nama\s*:?\s*', '', line).strip()
-                break
-            elif re.match(r'^[A-Z][A-Z\s\.,]+$', line) and " " in line:
-                if len(line.split()) >= 2 and len(line) > 5:
-                    data["Nama"] = line
-                    break
-
-    # Find Date of Birth
-    if nik_line_idx is not None:
-        for i in range(nik_line_idx + 1, len(lines)):
-            line = lines[i].lower()
-            if "lahir" in line or "tgl" in line or "tanggal" in line:
-                for j in range(i, min(i + 2, len(lines))):
-                    date_match = date_pattern.search(lines[j])
-                    if date_match:
-                        day, month, year = date_match.groups()
-                        if len(year) == 2:
-                            current_year = datetime.now().year % 100
-                            century = "20" if int(year) <= current_year else "19"
-                            year = f"{century}{year}"
-                        elif len(year) == 4 and year.startswith("00"):
-                            year = "20" + year[2:]
-                        data["Tanggal Lahir"] = f"{day.zfill(2)}-{month.zfill(2)}-{year}"
-                        break
-                if data["Tanggal Lahir"] != "Not found":
-                    break
-
-        if data["Tanggal Lahir"] == "Not found":
-            for i in range(nik_line_idx + 1, len(lines)):
-                date_match = date_pattern.search(lines[i])
-                if date_match:
-                    day, month, year = date_match.groups()
-                    if len(year) == 2:
-                        current_year = datetime.now().year % 100
-                        century = "20" if int(year) <= current_year else "19"
-                        year = f"{century}{year}"
-                    elif len(year) == 4 and year.startswith("00"):
-                        year = "20" + year[2:]
-                    if 1 <= int(day) <= 31 and 1 <= int(month) <= 12:
-                        data["Tanggal Lahir"] = f"{day.zfill(2)}-{month.zfill(2)}-{year}"
-                        break
-    return data
+metrics.gauge_function('queue_depth', ocr_pool.queue_depth, help="OCR requests queued or running")
+metrics.gauge_function('model_load_seconds', worker_load_seconds, help="Time taken to load each model")
+metrics.gauge_function('cache_entries', lambda: ocr_cache.stats()["entries"], help="OCR results held in memory")
+
+def get_face_embedder():
+    global _face_embedder
+    with _face_embedder_lock:
+        if _face_embedder is None:
+            from faceverification.matching import FaceEmbedder
+            started = time.perf_counter()
+            _face_embedder = FaceEmbedder(FACE_SFACE_MODEL)
+            metrics.set_gauge('model_load_seconds', round(time.perf_counter() - started, 3), {'model': 'sface'})
+        return _face_embedder
+
+# Step 0: Decode and downsample the upload
+def load_upload(file):
+    with metrics.stage('decode'):
+        return prepare_image(file.read(), max_side=OCR_MAX_SIDE, grayscale=OCR_GRAYSCALE)
+
+# Step 1: Perform OCR
+def perform_ocr(image):
+    return ocr_pool.readtext(image, timeout=ocr_pool.task_timeout * 2)
+
+# Step 1b: Recognize only the KTP field regions
+def perform_field_ocr(image):
+    return ocr_pool.read_fields(image, timeout=ocr_pool.task_timeout * 2)
+
+# Step 2: OCR and parse, reusing cached results for images seen before
+def read_ktp(image, mode):
+    key = image_key(image, mode)
+    entry = ocr_cache.get(key)
+    if entry is None:
+        if mode == 'fields':
+            with metrics.stage('ocr'):
+                ocr = perform_field_ocr(image)
+            with metrics.stage('parse'):
+                data, confidence = parse_ktp_fields(ocr)
+        else:
+            with metrics.stage('ocr'):
+                ocr = perform_ocr(image)
+            with metrics.stage('parse'):
+                data, confidence = parse_ktp_results(ocr)
+        entry = {"ocr": ocr, "data": data, "confidence": confidence}
+        ocr_cache.put(key, entry)
+    else:
+        metrics.inc('cache_hits_total', help="OCR requests answered from the cache")
+    return entry["data"], entry["confidence"]
+
+# Step 3: Embed the holder's photo from the card already decoded for OCR
+def remember_ktp_face(ktp_face_id, image):
+    with metrics.stage('face_embed'):
+        embedding = get_face_embedder().embed(portrait_crop(image))
+    if embedding is not None:
+        face_embeddings.put((ktp_face_id, 'ktp'), embedding, embedding.nbytes)
+    return embedding
 
 # Flask Route
 @app.route('/extract-ktp', methods=['POST'])
@@ -105,19 +141,92 @@ def extract_ktp():
     if 'id_card_image' not in request.files:
         return jsonify({"success": False, "message": "No file uploaded"}), 400
     
-    file = request.files['id_card_image']
-    file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-    file.save(file_path)
+    try:
+        image = load_upload(request.files['id_card_image'])
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Could not read image: {e}"}), 400
 
     try:
-        extracted_text = perform_ocr(file_path)
-        ktp_info = extract_ktp_info(extracted_text)
+        ktp_info = None
+        if OCR_MODE == 'fields':
+            ktp_info, confidence = read_ktp(image, 'fields')
+            if ktp_info["NIK"] == NOT_FOUND:
+                # Card outline or layout not recognized; read the whole card
+                ktp_info = None
+        if ktp_info is None:
+            ktp_info, confidence = read_ktp(image, 'full')
 
-        return jsonify({"success": True, "data": ktp_info})
+        body = {"success": True, "data": ktp_info, "confidence": confidence}
+        # The portrait is kept under an id issued here rather than anything the
+        # user can edit later, such as a corrected NIK
+        if FACE_SFACE_MODEL:
+            try:
+                ktp_face_id = secrets.token_urlsafe(16)
+                body["portrait_found"] = remember_ktp_face(ktp_face_id, image) is not None
+                if body["portrait_found"]:
+                    body["ktp_face_id"] = ktp_face_id
+            except Exception as e:
+                # Face matching is an extra; OCR results still go back
+                app.logger.warning("KTP portrait embedding failed: %s", e)
+                body["portrait_found"] = False
+        return jsonify(body)
+    except PoolBusy as e:
+        return jsonify({"success": False, "error": str(e)}), 503, {"Retry-After": "2"}
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
-    finally:
-        os.remove(file_path)
+
+@app.route('/match-face', methods=['POST'])
+def match_face():
+    """
+    Compare a selfie ('image') with the KTP photo of 'ktp_face_id'. The KTP
+    embedding comes from the earlier /extract-ktp call that returned that
+    id, or from an 'id_card_image' sent along.
+    """
+    if not FACE_SFACE_MODEL:
+        return jsonify({"success": False, "message": "Face matching is not configured"}), 503
+    ktp_face_id = request.form.get('ktp_face_id')
+    if not ktp_face_id or 'image' not in request.files:
+        return jsonify({"success": False, "message": "ktp_face_id and image are required"}), 400
+
+    try:
+        with metrics.stage('decode'):
+            selfie = prepare_image(request.files['image'].read(), max_side=OCR_MAX_SIDE)
+            card = None
+            if 'id_card_image' in request.files:
+                card = prepare_image(request.files['id_card_image'].read(), max_side=OCR_MAX_SIDE)
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Could not read image: {e}"}), 400
+
+    try:
+        from faceverification.matching import MATCH_THRESHOLD, similarity
+
+        ktp_embedding = remember_ktp_face(ktp_face_id, card) if card is not None \
+            else face_embeddings.get((ktp_face_id, 'ktp'))
+        if ktp_embedding is None:
+            return jsonify({"success": False, "message": "No KTP portrait for this id"}), 404
+
+        selfie_key = (ktp_face_id, 'selfie', image_key(selfie, 'selfie'))
+        selfie_embedding = face_embeddings.get(selfie_key)
+        if selfie_embedding is None:
+            with metrics.stage('face_embed'):
+                selfie_embedding = get_face_embedder().embed(selfie)
+            if selfie_embedding is None:
+                return jsonify({"success": False, "message": "No face found in the selfie"}), 400
+            face_embeddings.put(selfie_key, selfie_embedding, selfie_embedding.nbytes)
+
+        score = similarity(ktp_embedding, selfie_embedding)
+        return jsonify({"success": score >= MATCH_THRESHOLD, "similarity": score, "threshold": MATCH_THRESHOLD})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/health', methods=['GET'])
+def health():
+    status = ocr_pool.health()
+    status["cache"] = ocr_cache.stats()
+    return jsonify(status), 200 if status["healthy"] else 503
 
 if __name__ == '__main__':
-    app.run(host='127.0.0.1', port=5000, debug=True)
+    # Load the models before accepting requests; the reloader would start a second pool
+    start()
+    ocr_pool.start()
+    app.run(host='127.0.0.1', port=5000, debug=True, use_reloader=False)
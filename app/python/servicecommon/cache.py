@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class BoundedCache:
+    """
+    Thread-safe LRU cache bounded by entry count, total size and entry age.
+
+    Each entry carries a caller-supplied size in bytes. Expired entries are
+    dropped when the cache is next accessed or by purge_expired(); see
+    purge_periodically() for caches that may sit idle.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=None, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._evict(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size=0):
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._purge_expired()
+            if self.max_bytes is not None and size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            self._shrink()
+            return value
+
+    def get_or_create(self, key, factory):
+        """Return the cached value for key, building it with factory() on a miss."""
+        value = self.get(key)
+        if value is None:
+            value, size = factory()
+            self.put(key, value, size)
+        return value
+
+    def pop(self, key):
+        """Remove key and return its value, or None if it was not cached."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            value = self._entries[key][0]
+            self._evict(key)
+            return value
+
+    def purge_expired(self):
+        with self._lock:
+            self._purge_expired()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expired(self, entry):
+        return self.ttl is not None and time.monotonic() - entry[2] > self.ttl
+
+    def _purge_expired(self):
+        if self.ttl is None:
+            return
+        for key in [k for k, entry in self._entries.items() if self._expired(entry)]:
+            self._evict(key)
+
+    def _shrink(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+def purge_periodically(interval, *caches):
+    """
+    Start a daemon thread that calls purge_expired() on every cache each
+    interval seconds, so expired entries are released even without traffic.
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            for cache in caches:
+                try:
+                    cache.purge_expired()
+                except Exception:
+                    # A failing cache must not stop the others from being purged
+                    pass
+
+    thread = threading.Thread(target=run, name='cache-purge', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket bounds in seconds, from a fast decode to a slow OCR batch
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in labels
+    )
+    return "{" + pairs + "}"
+
+
+def _number(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+
+class ServiceMetrics:
+    """
+    Request counters, per-stage timings and gauges of one Flask service,
+    rendered in Prometheus text format.
+
+    Metric names are prefixed with namespace. stage(name) times a block
+    into <namespace>_stage_duration_seconds and, inside a request, into
+    that request's Server-Timing header when server_timing is set; it
+    defaults to METRICS_SERVER_TIMING=1. Gauge functions are evaluated at
+    scrape time.
+    """
+
+    def __init__(self, namespace, server_timing=None):
+        self.namespace = namespace
+        if server_timing is None:
+            server_timing = os.environ.get('METRICS_SERVER_TIMING', '0') == '1'
+        self.server_timing = server_timing
+        self._lock = threading.Lock()
+        self._counters = {}    # name -> {labels: value}
+        self._histograms = {}  # name -> {labels: _Histogram}
+        self._gauges = {}      # name -> {labels: value}
+        self._gauge_functions = {}  # name -> fn returning a number or {labels: number}
+        self._help = {}
+        self._in_flight = 0
+
+    def _name(self, name, help):
+        name = f"{self.namespace}_{name}"
+        if help:
+            self._help.setdefault(name, help)
+        return name
+
+    def inc(self, name, labels=None, value=1, help=None):
+        name = self._name(name, help)
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=None, help=None):
+        name = self._name(name, help)
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            self._histograms.setdefault(name, {}).setdefault(key, _Histogram()).observe(seconds)
+
+    def set_gauge(self, name, value, labels=None, help=None):
+        name = self._name(name, help)
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def gauge_function(self, name, fn, help=None):
+        """
+        Report fn() as a gauge on every scrape. fn returns a number, or a
+        dict mapping label tuples such as (('worker', 0),) to numbers.
+        """
+        self._gauge_functions[self._name(name, help)] = fn
+
+    def observe_stage(self, stage, seconds):
+        """Record one stage duration; usable as a callback from worker threads."""
+        self.observe('stage_duration_seconds', seconds, {'stage': stage},
+                     help="Time spent in each processing stage")
+        self._add_server_timing(stage, seconds)
+
+    @contextmanager
+    def stage(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start)
+
+    def _add_server_timing(self, stage, seconds):
+        if not self.server_timing:
+            return
+        from flask import g, has_request_context
+
+        if not has_request_context():
+            return
+        timings = g.setdefault('server_timing', {})
+        # Stages repeated within a request (one per signature box) add up
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+    # ====== Flask integration ======
+
+    def instrument(self, app):
+        """Count and time every request of app and serve GET /metrics."""
+        from flask import Response, g, request
+
+        @app.before_request
+        def _start_request():
+            g.metrics_started = time.perf_counter()
+            with self._lock:
+                self._in_flight += 1
+
+        @app.after_request
+        def _finish_request(response):
+            started = g.pop('metrics_started', None)
+            if started is None:
+                return response
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._in_flight -= 1
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            self.inc('requests_total', {
+                'endpoint': endpoint, 'method': request.method, 'status': response.status_code
+            }, help="Requests handled, by endpoint, method and status")
+            self.observe('request_duration_seconds', elapsed, {'endpoint': endpoint},
+                         help="Time from request start to response, excluding streamed bodies")
+
+            if self.server_timing:
+                timings = g.get('server_timing', {})
+                parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+                parts.append(f"total;dur={elapsed * 1000:.1f}")
+                response.headers['Server-Timing'] = ", ".join(parts)
+            return response
+
+        @app.route('/metrics', methods=['GET'])
+        def metrics():
+            return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+        return app
+
+    def render(self):
+        lines = []
+
+        def header(name, kind):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        gauges = {}
+        for name, fn in self._gauge_functions.items():
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if value is None:
+                continue
+            gauges[name] = value if isinstance(value, dict) else {(): value}
+
+        with self._lock:
+            in_flight = self._in_flight
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {
+                name: {key: (list(h.counts), h.count, h.sum) for key, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+            for name, series in self._gauges.items():
+                gauges.setdefault(name, {}).update(series)
+
+        name = f"{self.namespace}_requests_in_flight"
+        self._help.setdefault(name, "Requests currently being handled")
+        gauges[name] = {(): in_flight}
+
+        for name, series in sorted(counters.items()):
+            header(name, 'counter')
+            for key, value in series.items():
+                lines.append(f"{name}{_label_text(key)} {_number(value)}")
+
+        for name, series in sorted(histograms.items()):
+            header(name, 'histogram')
+            for key, (counts, count, total) in series.items():
+                for bound, bucket in zip(DURATION_BUCKETS + (float('inf'),), counts + [count]):
+                    lines.append(f"{name}_bucket{_label_text(key + (('le', _number(bound)),))} {bucket}")
+                lines.append(f"{name}_sum{_label_text(key)} {_number(total)}")
+                lines.append(f"{name}_count{_label_text(key)} {count}")
+
+        for name, series in sorted(gauges.items()):
+            header(name, 'gauge')
+            for key, value in series.items():
+                lines.append(f"{name}{_label_text(key)} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
@@ -1,66 +1,237 @@
-from flask import Flask, request, jsonify
-import subprocess
+from flask import Flask, Request, Response, request, jsonify, stream_with_context
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from io import BytesIO
+import json
 import os
 import tempfile
 
+from documentsigning.apply_signature import SPOOL_MAX_BYTES, sign_document
+from documentsigning.batch import iter_archive_documents, sign_batch
+from documentsigning.jobs import JobQueue, QueueFull
+from documentsigning.signer_cache import SignerCache
+from servicecommon.cache import purge_periodically
+from servicecommon.metrics import ServiceMetrics
+
+
+class SpooledRequest(Request):
+    # Keep small uploads in memory and spill large ones to disk. The
+    # signing engine appends its revisions to this stream in place.
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode='w+b')
+
+
 app = Flask(__name__)
+app.request_class = SpooledRequest
+
+# Request counts and per-stage timings on GET /metrics
+metrics = ServiceMetrics('signer')
+metrics.instrument(app)
+
+# Signed documents larger than this are streamed back in chunks
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Loaded signers are reused across requests that resend the same credentials
+signer_cache = SignerCache(
+    max_entries=int(os.environ.get('SIGNER_CACHE_ENTRIES', 256)),
+    max_bytes=int(os.environ.get('SIGNER_CACHE_BYTES', 8 * 1024 * 1024)),
+    ttl=float(os.environ.get('SIGNER_CACHE_TTL', 900))
+)
+
+# Drop expired signers, and with them the key material, even when idle
+purge_periodically(float(os.environ.get('SIGNER_CACHE_PURGE_INTERVAL', 60)), signer_cache)
+
+# Shared worker pool for batch signing
+batch_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('SIGNER_BATCH_WORKERS', os.cpu_count() or 4))
+)
+
+# Asynchronous signing jobs: submit returns at once, clients poll for the result
+job_queue = JobQueue(
+    workers=int(os.environ.get('SIGNER_JOB_WORKERS', os.cpu_count() or 4)),
+    max_pending=int(os.environ.get('SIGNER_JOB_MAX_PENDING', 64)),
+    result_ttl=float(os.environ.get('SIGNER_JOB_RESULT_TTL', 600))
+)
+
+# Release finished jobs that were never fetched, and their signed documents
+purge_periodically(float(os.environ.get('SIGNER_JOB_PURGE_INTERVAL', 60)), job_queue)
+
+# Upper bound for a single long-poll request
+MAX_JOB_WAIT = 30
+
+metrics.gauge_function('job_queue_depth', job_queue.pending, help="Signing jobs queued or running")
+metrics.gauge_function('signer_cache_entries', lambda: signer_cache.stats()["entries"],
+                       help="Loaded signers held in the cache")
+
+def detach_upload(upload):
+    """
+    Take over an upload's spooled stream so it outlives the request.
+    Closing the request then closes an empty placeholder instead, and the
+    caller closes the returned stream.
+    """
+    stream = upload.stream
+    upload.stream = BytesIO()
+    stream.seek(0)
+    return stream
+
+def pdf_response(stream):
+    headers = {'Content-Disposition': 'attachment; filename="signed.pdf"'}
+    size = stream.seek(0, os.SEEK_END)
+    stream.seek(0)
+    if size <= SPOOL_MAX_BYTES:
+        return Response(stream.read(), mimetype='application/pdf', headers=headers)
+
+    def generate():
+        while True:
+            chunk = stream.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+    headers['Content-Length'] = str(size)
+    return Response(stream_with_context(generate()), mimetype='application/pdf', headers=headers)
 
 @app.route('/sign', methods=['POST'])
 def sign_pdf():
+    document = None
     try:
-        # Extract uploaded files
-        document = request.files['document']
-        certificate = request.files['certificate']
-        signature_data = request.files['signature_data']
-        signature_box = request.files['signature_box']
-        private_key = request.files['private_key']
-
-        # Use a temporary directory for file handling
-        with tempfile.TemporaryDirectory() as temp_dir:
-            doc_path = os.path.join(temp_dir, 'document.pdf')
-            cert_path = os.path.join(temp_dir, 'certificate.pem')
-            sig_data_path = os.path.join(temp_dir, 'signature.dat')
-            box_path = os.path.join(temp_dir, 'boxes.json')
-            key_path = os.path.join(temp_dir, 'private_key.pem')
-            output_path = os.path.join(temp_dir, 'signed.pdf')
-
-            # Save files
-            document.save(doc_path)
-            certificate.save(cert_path)
-            signature_data.save(sig_data_path)
-            signature_box.save(box_path)
-            private_key.save(key_path)
-
-            # Construct full path to apply_signature.py
-            script_path = os.path.join(os.path.dirname(__file__), 'documentsigning', 'apply_signature.py')
-
-            # Call the script
-            result = subprocess.run(
-                [
-                    'python', script_path,
-                    doc_path, cert_path, sig_data_path, box_path, output_path, key_path
-                ],
-                capture_output=True,
-                text=True
-            )
-
-            if result.returncode != 0:
-                return jsonify({
-                    'success': False,
-                    'error': result.stderr
-                }), 500
-
-            with open(output_path, 'rb') as signed_file:
-                return signed_file.read(), 200, {
-                    'Content-Type': 'application/pdf',
-                    'Content-Disposition': 'attachment; filename="signed.pdf"'
-                }
+        # Extract uploaded files; the multipart body is spooled on first access
+        with metrics.stage('upload'):
+            certificate = request.files['certificate']
+            # signature_data is still sent by Laravel but the stamp image is
+            # taken from the signature box content, so it is not read here.
+            signature_box = request.files['signature_box']
+            private_key = request.files['private_key']
+
+        with metrics.stage('credentials'):
+            boxes = json.load(signature_box.stream)
+            signer = signer_cache.get_signer(certificate.read(), private_key.read())
+
+        with metrics.stage('upload'):
+            # Large results are streamed after the request is closed, so the
+            # response takes over the spooled upload and it is signed in place
+            document = detach_upload(request.files['document'])
+
+        # Sign in-process instead of spawning apply_signature.py
+        signed = sign_document(document, None, boxes, signer=signer, stage=metrics.stage)
+
+        with metrics.stage('write'):
+            response = pdf_response(signed)
+        response.call_on_close(signed.close)
+        return response
 
     except Exception as e:
+        if document is not None:
+            document.close()
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/sign/batch', methods=['POST'])
+def sign_batch_pdfs():
+    """
+    Sign many documents with one credential. Documents are sent as repeated
+    'documents' files and/or one zip/tar 'archive'. Results are streamed back
+    as newline-delimited JSON, one line per document as it completes.
+    """
+    # Uploads are closed once this view returns, so the response takes over
+    # every document's spool before streaming starts
+    documents = []
+
+    def close_documents():
+        for _, document in documents:
+            document.close()
+
+    try:
+        with metrics.stage('upload'):
+            certificate = request.files['certificate']
+            private_key = request.files['private_key']
+        with metrics.stage('credentials'):
+            boxes = json.load(request.files['signature_box'].stream)
+            signer = signer_cache.get_signer(certificate.read(), private_key.read())
+        with metrics.stage('upload'):
+            for upload in request.files.getlist('documents'):
+                documents.append((upload.filename, detach_upload(upload)))
+            if 'archive' in request.files:
+                # Reading the archive here rejects a corrupt one before any output
+                for document in iter_archive_documents(request.files['archive'].stream):
+                    documents.append(document)
+        if not documents:
+            raise ValueError("No documents or archive given")
+    except Exception as e:
+        close_documents()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    def generate():
+        # Closing the results on a client disconnect stops the batch before
+        # close_documents runs, so no worker is left signing a closed stream
+        with closing(sign_batch(documents, boxes, signer, batch_executor, stage=metrics.stage)) as results:
+            for result in results:
+                yield json.dumps(result) + '\n'
+
+    response = Response(generate(), mimetype='application/x-ndjson')
+    response.call_on_close(close_documents)
+    return response
+
+@app.route('/jobs', methods=['POST'])
+def submit_signing_job():
+    """Queue a signing job with the same fields as /sign and return its id."""
+    try:
+        with metrics.stage('upload'):
+            certificate = request.files['certificate']
+            private_key = request.files['private_key']
+        with metrics.stage('credentials'):
+            boxes = json.load(request.files['signature_box'].stream)
+            signer = signer_cache.get_signer(certificate.read(), private_key.read())
+        with metrics.stage('upload'):
+            # The upload stream is closed with the request, so the job takes it over
+            document = detach_upload(request.files['document'])
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    try:
+        job = job_queue.submit(sign_document, document, None, boxes, signer=signer, stage=metrics.stage)
+    except QueueFull as e:
+        document.close()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503, {'Retry-After': '5'}
+
+    return jsonify({'success': True, **job.to_dict()}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def signing_job_status(job_id):
+    """Job status; ?wait=<seconds> long-polls until the job finishes."""
+    wait = min(max(request.args.get('wait', 0, type=float), 0), MAX_JOB_WAIT)
+    job = job_queue.wait(job_id, wait)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    return jsonify({'success': job.status != 'failed', **job.to_dict()})
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def signing_job_result(job_id):
+    """Download a finished job's signed PDF. Results can be fetched once."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    if job.status not in ('done', 'failed'):
+        return jsonify({'success': False, **job.to_dict()}), 409
+    if job_queue.pop(job_id) is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    if job.status == 'failed':
+        return jsonify({'success': False, **job.to_dict()}), 500
+
+    response = pdf_response(job.result)
+    response.call_on_close(job.result.close)
+    return response
+
 if __name__ == '__main__':
     app.run(port=5001)
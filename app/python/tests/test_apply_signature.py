@@ -0,0 +1,83 @@
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip('pyhanko')
+
+from benchmarks import fixtures
+from documentsigning.apply_signature import sign_document, signature_field_spec
+from pyhanko.pdf_utils import generic
+from pyhanko.pdf_utils.incremental_writer import IncrementalPdfFileWriter
+from pyhanko.pdf_utils.reader import PdfFileReader
+
+
+@pytest.fixture(scope='module')
+def credentials():
+    return fixtures.make_credentials()
+
+
+def test_each_box_is_signed_in_its_own_revision(credentials):
+    cert_pem, key_pem = credentials
+    boxes = fixtures.make_boxes(2, 3, fixtures.make_signature_png())
+
+    signed = sign_document(fixtures.make_pdf(2), cert_pem, boxes, private_key=key_pem)
+
+    reader = PdfFileReader(signed)
+    assert reader.xrefs.total_revisions == 4
+    assert [(sig.field_name, sig.signed_revision) for sig in reader.embedded_signatures] == [
+        ('Signature1', 1), ('Signature2', 2), ('Signature3', 3)
+    ]
+
+
+def test_duplicate_box_ids_are_rejected(credentials):
+    cert_pem, key_pem = credentials
+    boxes = fixtures.make_boxes(2, 2)
+    boxes[1]['box_id'] = boxes[0]['box_id']
+    document = BytesIO(fixtures.make_pdf(2))
+
+    with pytest.raises(ValueError, match="unique"):
+        sign_document(document, cert_pem, boxes, private_key=key_pem)
+    assert document.getvalue() == fixtures.make_pdf(2)
+
+
+def writer_for_page(**entries):
+    """An A4 page with extra page dictionary entries, reopened for signing."""
+    writer = IncrementalPdfFileWriter(BytesIO(fixtures.make_pdf(1)))
+    page_ref, _ = writer.find_page_for_modification(0)
+    page = page_ref.get_object()
+    for name, value in entries.items():
+        page['/' + name] = value
+    writer.update_container(page)
+    out = BytesIO()
+    writer.write(out)
+    return IncrementalPdfFileWriter(out)
+
+
+# A box 10% from the left and 20% from the top of the displayed page,
+# 30% of its width wide and 10% of its height tall, on an A4 page (595 x 842)
+SIG_BOX = {'page': 1, 'x': 0.1, 'y': 0.2, 'width': 0.3, 'height': 0.1, 'box_id': 'Signature1'}
+
+
+@pytest.mark.parametrize('rotate, expected', [
+    (0, (59.5, 589.4, 238.0, 673.6)),
+    (90, (119.0, 84.2, 178.5, 336.8)),
+    (180, (357.0, 168.4, 535.5, 252.6)),
+    (270, (416.5, 505.2, 476.0, 757.8)),
+])
+def test_signature_box_follows_page_rotation(rotate, expected):
+    writer = writer_for_page(Rotate=generic.NumberObject(rotate))
+
+    spec = signature_field_spec(writer, SIG_BOX)
+
+    assert spec.on_page == 0
+    assert spec.box == pytest.approx(expected)
+
+
+def test_signature_box_is_placed_within_the_crop_box():
+    crop_box = generic.ArrayObject([generic.NumberObject(v) for v in (50, 100, 545, 742)])
+    writer = writer_for_page(CropBox=crop_box)
+
+    spec = signature_field_spec(writer, SIG_BOX)
+
+    # 495 x 642 visible, measured from the crop box's top-left corner (50, 742)
+    assert spec.box == pytest.approx((99.5, 549.4, 248.0, 613.6))
@@ -0,0 +1,29 @@
+import queue
+import time
+
+from benchmarks import run
+
+
+def run_fake_stage(monkeypatch, check):
+    def setup():
+        def op():
+            return {"faces": []}
+        op.check = check
+        return op
+    monkeypatch.setitem(run.STAGES, 'fake', (setup, [{}]))
+    results = queue.Queue()
+    run._run_case('fake', {}, 2, 1, time.time(), results)
+    return results.get_nowait()
+
+
+def test_case_missing_its_path_is_skipped(monkeypatch):
+    outcome = run_fake_stage(monkeypatch, lambda face_data: None if face_data["faces"] else "no face found")
+
+    assert outcome == {"status": "skipped", "error": "no face found"}
+
+
+def test_case_passing_its_check_is_timed(monkeypatch):
+    outcome = run_fake_stage(monkeypatch, lambda face_data: None)
+
+    assert outcome["status"] == "ok"
+    assert outcome["warm"]["iterations"] == 2
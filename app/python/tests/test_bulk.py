@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+pytest.importorskip('cv2')
+
+from idcardocr import bulk
+
+
+class InlinePool:
+    """multiprocessing Pool stand-in that runs tasks in this process."""
+
+    def __init__(self, workers, initializer=None, initargs=()):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def imap_unordered(self, fn, items, chunksize=1):
+        return map(fn, items)
+
+
+class InlineContext:
+    Pool = InlinePool
+
+
+def write_records(path, *records, tail=''):
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records) + tail, encoding='utf-8')
+
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+def test_completed_paths_truncates_a_partial_last_line(tmp_path):
+    output = tmp_path / 'out.jsonl'
+    write_records(output, {'path': 'a.jpg', 'data': {}}, {'path': 'b.jpg', 'error': 'boom'},
+                  tail='{"path": "c.jpg", "da')
+
+    assert bulk.completed_paths(str(output)) == {'a.jpg'}
+    assert [record['path'] for record in read_records(output)] == ['a.jpg', 'b.jpg']
+
+
+def test_completed_paths_without_output(tmp_path):
+    assert bulk.completed_paths(str(tmp_path / 'missing.jsonl')) == set()
+
+
+def test_resumed_run_processes_only_missing_and_failed_images(tmp_path, monkeypatch):
+    images = tmp_path / 'cards'
+    images.mkdir()
+    paths = [str(images / f'{name}.jpg') for name in ('a', 'b', 'c', 'd')]
+    for path in paths:
+        open(path, 'wb').close()
+
+    output = tmp_path / 'out.jsonl'
+    write_records(output, {'path': paths[0], 'data': {}}, {'path': paths[1], 'error': 'boom'},
+                  tail=json.dumps({'path': paths[2]})[:10])
+
+    processed = []
+
+    def fake_process(path):
+        processed.append(path)
+        return {'path': path, 'data': {}}
+    monkeypatch.setattr(bulk.multiprocessing, 'get_context', lambda method: InlineContext())
+    monkeypatch.setattr(bulk, '_process', fake_process)
+
+    assert bulk.run_bulk(str(images), str(output), workers=1) == (3, 1, 0)
+    assert sorted(processed) == paths[1:]
+    assert [record['path'] for record in read_records(output)] == paths[:2] + sorted(processed)
@@ -0,0 +1,49 @@
+import os
+import time
+
+import pytest
+
+from faceverification.debug_images import DebugImageStore
+
+
+def write(path):
+    with open(path, 'wb') as f:
+        f.write(b'jpeg')
+
+
+@pytest.mark.parametrize('name, session_id', [
+    ('../escape.jpg', 'abc'), ('output.jpg', '..'), ('/etc/passwd', None), ('a\\b.jpg', 'abc'), ('', 'abc'),
+])
+def test_paths_outside_the_session_directory_are_rejected(tmp_path, name, session_id):
+    with pytest.raises(ValueError):
+        DebugImageStore(str(tmp_path)).path(name, session_id)
+
+
+def test_drop_removes_the_sessions_images(tmp_path):
+    store = DebugImageStore(str(tmp_path))
+    write(store.path('output_initial.jpg', 'abc'))
+    write(store.path('output_initial.jpg', 'other'))
+
+    store.drop('abc')
+    store.drop('..')
+
+    assert not os.path.exists(tmp_path / 'abc')
+    assert os.path.exists(tmp_path / 'other' / 'output_initial.jpg')
+
+
+def test_purge_expired_removes_untouched_sessions(tmp_path):
+    store = DebugImageStore(str(tmp_path), ttl=60)
+    old = store.path('output_initial.jpg', 'old')
+    write(old)
+    write(store.path('output_initial.jpg', 'recent'))
+    # The directory itself is old but one image in it was just rewritten
+    touched = store.path('output_blink.jpg', 'touched')
+    write(touched)
+    long_ago = time.time() - 120
+    os.utime(old, (long_ago, long_ago))
+    for directory in ('old', 'touched'):
+        os.utime(tmp_path / directory, (long_ago, long_ago))
+
+    store.purge_expired()
+
+    assert sorted(os.listdir(tmp_path)) == ['recent', 'touched']
@@ -0,0 +1,38 @@
+import threading
+
+import numpy as np
+import pytest
+
+from faceverification.sessions import SessionStore
+
+
+def test_concurrent_steps_of_a_new_session_share_one_session():
+    store = SessionStore()
+    steps = ['initial', 'blink', 'turn_head', 'smile']
+    barrier = threading.Barrier(len(steps))
+
+    def record(step):
+        barrier.wait()
+        store.record('abc', step, True, {})
+
+    threads = [threading.Thread(target=record, args=(step,)) for step in steps]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(store.get('abc').summary()['steps']) == set(steps)
+
+
+def test_step_over_the_byte_limit_is_rejected():
+    store = SessionStore(max_bytes=1000)
+    store.record('abc', 'initial', True, {}, image=np.zeros(600, np.uint8))
+    # Replacing a step's frame only counts the new frame
+    store.record('abc', 'initial', True, {}, image=np.zeros(900, np.uint8))
+
+    with pytest.raises(ValueError):
+        store.record('abc', 'blink', True, {}, landmarks=np.zeros(200, np.uint8))
+
+    session = store.get('abc')
+    assert 'blink' not in session.summary()['steps']
+    assert store.stats()['bytes'] == 900
@@ -0,0 +1,27 @@
+import time
+from io import BytesIO
+
+from documentsigning.jobs import JobQueue
+
+
+def test_purge_expired_releases_unfetched_results():
+    queue = JobQueue(workers=1, result_ttl=0)
+    job = queue.submit(BytesIO, b'%PDF-1.7')
+    assert queue.wait(job.id, 5).status == 'done'
+    time.sleep(0.01)
+
+    queue.purge_expired()
+
+    assert queue.get(job.id) is None
+    assert job.result.closed
+
+
+def test_purge_expired_keeps_recent_results():
+    queue = JobQueue(workers=1, result_ttl=600)
+    job = queue.submit(BytesIO, b'%PDF-1.7')
+    queue.wait(job.id, 5)
+
+    queue.purge_expired()
+
+    assert queue.get(job.id) is job
+    assert not job.result.closed
@@ -0,0 +1,104 @@
+import random
+
+import pytest
+
+from benchmarks import fixtures
+from idcardocr.parsing import NOT_FOUND, group_lines, parse_ktp_lines, parse_ktp_results, parse_ktp_text
+
+HOLDER = fixtures.KTP_HOLDER
+
+
+def lines(*texts):
+    return [(text, 0.9) for text in texts]
+
+
+def test_group_lines_merges_tokens_left_to_right_whatever_their_order():
+    results = fixtures.make_ocr_results()
+    shuffled = random.Random(1).sample(results, len(results))
+
+    merged = group_lines(shuffled)
+
+    assert merged == group_lines(results)
+    assert merged[0] == ("PROVINSI DKI JAKARTA", 0.92)
+    assert merged[2] == (f"NIK : {HOLDER['NIK']}", 0.92)
+    assert len(merged) == 13
+
+
+def test_group_lines_keeps_the_weakest_token_confidence():
+    results = [
+        ([[0, 0], [40, 0], [40, 30], [0, 30]], "Nama", 0.95),
+        ([[100, 2], [300, 2], [300, 32], [100, 32]], "BUDI SANTOSO", 0.61),
+        ([[0, 60], [40, 60], [40, 90], [0, 90]], "Agama", 0.9),
+    ]
+
+    assert group_lines(results) == [("Nama BUDI SANTOSO", 0.61), ("Agama", 0.9)]
+
+
+def test_full_card_results_are_parsed():
+    data, confidence = parse_ktp_results(fixtures.make_ocr_results())
+
+    assert data == HOLDER
+    assert confidence == {"NIK": 0.92, "Nama": 0.92, "Tanggal Lahir": 0.92}
+
+
+def test_values_on_the_line_after_their_labels():
+    data, _ = parse_ktp_lines(lines(
+        "PROVINSI JAWA BARAT",
+        "NIK",
+        "3273012345678901",
+        "Nama",
+        "SITI AMINAH",
+        "Tempat/Tgl Lahir",
+        "BANDUNG, 02-01-1985",
+    ))
+
+    assert data == {"NIK": "3273012345678901", "Nama": "SITI AMINAH", "Tanggal Lahir": "02-01-1985"}
+
+
+def test_uppercase_name_without_a_label():
+    data, _ = parse_ktp_lines(lines("NIK : 3273012345678901", "SITI AMINAH", "BANDUNG 02-01-1985"))
+
+    assert data["Nama"] == "SITI AMINAH"
+
+
+def test_name_is_only_looked_for_near_the_nik():
+    data, _ = parse_ktp_lines(lines(
+        "NIK : 3273012345678901", "a", "b", "c", "d", "SITI AMINAH",
+    ))
+
+    assert data["Nama"] == NOT_FOUND
+
+
+def test_labelled_date_wins_over_an_earlier_unlabelled_one():
+    data, _ = parse_ktp_lines(lines(
+        "NIK : 3273012345678901",
+        "Nama : SITI AMINAH",
+        "Berlaku 01-01-2030",
+        "Tgl Lahir : 02-01-1985",
+    ))
+
+    assert data["Tanggal Lahir"] == "02-01-1985"
+
+
+def test_unlabelled_date_is_the_fallback():
+    data, _ = parse_ktp_lines(lines("NIK : 3273012345678901", "Nama : SITI AMINAH", "BANDUNG 2/1/1985"))
+
+    assert data["Tanggal Lahir"] == "02-01-1985"
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("Tgl Lahir : 17-08-0004", "17-08-2004"),
+    ("Tgl Lahir : 17-08-75", "17-08-1975"),
+    ("Tgl Lahir : 17-13-1990", NOT_FOUND),
+])
+def test_birth_date_years_and_invalid_dates(text, expected):
+    data, _ = parse_ktp_lines(lines("NIK : 3273012345678901", text))
+
+    assert data["Tanggal Lahir"] == expected
+
+
+def test_nothing_is_found_without_a_nik():
+    data, confidence = parse_ktp_text("Nama : SITI AMINAH\nTgl Lahir : 02-01-1985")
+
+    assert data == {"NIK": NOT_FOUND, "Nama": NOT_FOUND, "Tanggal Lahir": NOT_FOUND}
+    assert confidence == {"NIK": 0.0, "Nama": 0.0, "Tanggal Lahir": 0.0}
@@ -0,0 +1,93 @@
+import queue
+import threading
+import time
+
+from flask import Flask, jsonify
+
+from idcardocr.worker_pool import OcrWorkerPool
+from servicecommon.metrics import ServiceMetrics
+
+
+class FakeProcess:
+    pid = 0
+
+    def is_alive(self):
+        return True
+
+
+class FakeHeartbeat:
+    @property
+    def value(self):
+        return time.time()
+
+
+class FakeWorker:
+    """Stands in for an OCR worker process; answers each batch from a thread."""
+
+    def __init__(self, worker_id, results):
+        self.id = worker_id
+        self.tasks = queue.Queue()
+        self.heartbeat = FakeHeartbeat()
+        self.process = FakeProcess()
+        self.ready = False
+        self.load_seconds = None
+        self.task_ids = set()
+        self.task_started = None
+        self.started_at = time.time()
+        self.restarts = 0
+        threading.Thread(target=self._run, args=(results,), daemon=True).start()
+
+    def _run(self, results):
+        results.put(('ready', self.id, None, None))
+        while True:
+            batch = self.tasks.get()
+            time.sleep(0.02)
+            for task_id, _, _ in batch:
+                results.put(('done', self.id, task_id, []))
+
+    def idle(self):
+        return self.ready and not self.task_ids
+
+
+class FakeContext:
+    Queue = queue.Queue
+
+
+def test_worker_timings_reach_the_requests_server_timing(monkeypatch):
+    metrics = ServiceMetrics('ocr', server_timing=True)
+    pool = OcrWorkerPool(workers=1, batch_window=0, on_stage=metrics.observe_stage)
+    monkeypatch.setattr(pool, '_context', FakeContext())
+    monkeypatch.setattr(pool, '_spawn', lambda worker_id: FakeWorker(worker_id, pool._results))
+
+    app = Flask(__name__)
+    metrics.instrument(app)
+
+    @app.route('/read')
+    def read():
+        return jsonify(pool.readtext(b'image', timeout=5))
+
+    response = app.test_client().get('/read')
+
+    assert response.status_code == 200
+    stages = [part.split(';')[0] for part in response.headers['Server-Timing'].split(', ')]
+    assert 'queue_wait' in stages
+    assert 'inference' in stages
+    assert 'ocr_stage_duration_seconds_count{stage="inference"} 1' in metrics.render()
+
+
+def test_server_timing_follows_the_environment(monkeypatch):
+    monkeypatch.setenv('METRICS_SERVER_TIMING', '1')
+    assert ServiceMetrics('ocr').server_timing
+    monkeypatch.delenv('METRICS_SERVER_TIMING')
+    assert not ServiceMetrics('ocr').server_timing
+
+
+def test_counters_render_as_prometheus_counters():
+    metrics = ServiceMetrics('ocr')
+    metrics.inc('cache_hits_total', help="OCR requests answered from the cache")
+    metrics.inc('cache_hits_total')
+
+    rendered = metrics.render()
+
+    assert '# TYPE ocr_cache_hits_total counter' in rendered
+    assert 'ocr_cache_hits_total 2' in rendered
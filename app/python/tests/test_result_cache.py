@@ -0,0 +1,52 @@
+import hashlib
+import time
+
+import numpy as np
+
+from idcardocr.result_cache import OcrResultCache, image_key
+
+ENTRY = {"ocr": [[[[0, 0], [1, 0], [1, 1], [0, 1]], "NIK", 0.9]], "data": {"NIK": "3171234567890123"},
+         "confidence": {"NIK": 0.9}}
+
+
+def test_image_key_is_stable_and_content_addressed():
+    image = np.arange(24, dtype=np.uint8).reshape(2, 4, 3)
+
+    # Keys outlive the process in the SQLite tier, so their format is fixed
+    expected = hashlib.sha256(b"full:(2, 4, 3):uint8" + image.tobytes()).hexdigest()
+    assert image_key(image, 'full') == expected
+    assert image_key(image.copy(), 'full') == expected
+
+    assert image_key(image, 'fields') != expected
+    assert image_key(image.reshape(4, 2, 3), 'full') != expected
+    assert image_key(image.astype(np.uint16), 'full') != expected
+    changed = image.copy()
+    changed[0, 0, 0] = 255
+    assert image_key(changed, 'full') != expected
+
+
+def test_results_survive_a_restart_through_sqlite(tmp_path):
+    path = str(tmp_path / 'ocr.sqlite')
+    OcrResultCache(path=path).put('key', ENTRY)
+
+    restarted = OcrResultCache(path=path)
+    assert restarted.get('key') == ENTRY
+    assert restarted.get('key') == ENTRY
+
+    stats = restarted.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 0
+    assert stats["disk_entries"] == 1
+
+
+def test_expired_rows_are_skipped_and_purged(tmp_path):
+    path = str(tmp_path / 'ocr.sqlite')
+    OcrResultCache(ttl=0.05, path=path).put('key', ENTRY)
+    time.sleep(0.1)
+
+    restarted = OcrResultCache(ttl=0.05, path=path)
+    assert restarted.get('key') is None
+    assert restarted.stats()["disk_entries"] == 1
+
+    restarted.purge_expired()
+    assert restarted.stats()["disk_entries"] == 0
@@ -0,0 +1,111 @@
+import json
+import time
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip('pyhanko')
+
+import signer_api
+from benchmarks import fixtures
+from documentsigning import apply_signature
+from pyhanko.pdf_utils.reader import PdfFileReader
+
+
+@pytest.fixture(scope='module')
+def credentials():
+    return fixtures.make_credentials()
+
+
+def sign_request(pdf, credentials, boxes):
+    cert_pem, key_pem = credentials
+    return {
+        'document': (BytesIO(pdf), 'document.pdf'),
+        'certificate': (BytesIO(cert_pem), 'cert.pem'),
+        'private_key': (BytesIO(key_pem), 'key.pem'),
+        'signature_box': (BytesIO(json.dumps(boxes).encode()), 'boxes.json'),
+        'signature_data': (BytesIO(b''), 'signature.png'),
+    }
+
+
+def test_sign_streams_documents_above_spool_threshold(monkeypatch, credentials):
+    # Spill the upload to disk, sign it there and stream it back
+    monkeypatch.setattr(apply_signature, 'SPOOL_MAX_BYTES', 10000)
+    monkeypatch.setattr(signer_api, 'SPOOL_MAX_BYTES', 10000)
+
+    def no_copy(stream):
+        pytest.fail("The uploaded document was copied")
+    monkeypatch.setattr(apply_signature, 'spooled_copy', no_copy)
+    pdf = fixtures.make_pdf(20)
+    assert len(pdf) > 10000
+
+    client = signer_api.app.test_client()
+    response = client.post(
+        '/sign',
+        data=sign_request(pdf, credentials, fixtures.make_boxes(20, 2, fixtures.make_signature_png())),
+        content_type='multipart/form-data'
+    )
+    signed = response.get_data()
+
+    assert response.status_code == 200
+    assert response.headers['Content-Length'] == str(len(signed))
+    assert signed.startswith(pdf[:8]) and len(signed) > len(pdf)
+    assert len(PdfFileReader(BytesIO(signed)).embedded_signatures) == 2
+
+
+def test_failed_job_reports_failure_and_closes_its_document(monkeypatch, credentials):
+    documents = []
+    detach_upload = signer_api.detach_upload
+
+    def tracking_detach(upload):
+        documents.append(detach_upload(upload))
+        return documents[-1]
+    monkeypatch.setattr(signer_api, 'detach_upload', tracking_detach)
+
+    # A box on a page the document does not have makes signing fail
+    boxes = [dict(fixtures.make_boxes(1, 1)[0], page=5)]
+    client = signer_api.app.test_client()
+    response = client.post(
+        '/jobs', data=sign_request(fixtures.make_pdf(1), credentials, boxes), content_type='multipart/form-data'
+    )
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+
+    assert client.get(f'/jobs/{job_id}?wait=abc').status_code == 200
+    status = client.get(f'/jobs/{job_id}?wait=10').get_json()
+    assert status['status'] == 'failed'
+    assert status['success'] is False
+    assert documents and documents[0].closed
+
+
+def test_disconnected_batch_stops_signing_before_closing_documents(monkeypatch, credentials):
+    from concurrent.futures import ThreadPoolExecutor
+    from documentsigning import batch
+
+    futures = []
+
+    class TrackingExecutor(ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            futures.append(super().submit(*args, **kwargs))
+            return futures[-1]
+
+    sign_one = batch._sign_one
+
+    def slow_sign_one(*args):
+        time.sleep(0.2)
+        return sign_one(*args)
+
+    monkeypatch.setattr(signer_api, 'batch_executor', TrackingExecutor(max_workers=1))
+    monkeypatch.setattr(batch, '_sign_one', slow_sign_one)
+
+    data = sign_request(fixtures.make_pdf(1), credentials, fixtures.make_boxes(1, 1))
+    data['documents'] = [(BytesIO(fixtures.make_pdf(1)), f'doc{i}.pdf') for i in range(4)]
+    del data['document']
+    response = signer_api.app.test_client().post('/sign/batch', data=data, content_type='multipart/form-data')
+    assert json.loads(next(iter(response.response)))['success'] is True
+
+    # The client goes away after the first result
+    response.close()
+
+    assert all(future.done() for future in futures)
+    assert sum(future.cancelled() for future in futures) >= 2
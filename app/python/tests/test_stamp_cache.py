@@ -0,0 +1,25 @@
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip('pyhanko')
+
+from benchmarks import fixtures
+from documentsigning.stamp_cache import CachedPdfImage, PreparedStamp
+from pyhanko.pdf_utils.incremental_writer import IncrementalPdfFileWriter
+
+
+def test_image_ref_belongs_to_the_current_writer():
+    image = CachedPdfImage(PreparedStamp(fixtures.make_signature_png()))
+    first = IncrementalPdfFileWriter(BytesIO(fixtures.make_pdf(1)))
+    second = IncrementalPdfFileWriter(BytesIO(fixtures.make_pdf(1)))
+
+    image.set_writer(first)
+    first_ref = image.image_ref
+    assert image.image_ref is first_ref
+
+    image.set_writer(second)
+    second_ref = image.image_ref
+
+    assert second_ref.get_pdf_handler() is second
+    assert first_ref.get_pdf_handler() is first
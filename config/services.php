@@ -40,4 +40,24 @@
         'database_url' => env('FIREBASE_DATABASE_URL'),
     ],
 
+    'signer' => [
+        'url' => env('SIGNER_API_URL', 'http://127.0.0.1:5001'),
+        'async' => env('SIGNER_ASYNC', false),
+        'job_timeout' => env('SIGNER_JOB_TIMEOUT', 120),
+        'poll_wait' => env('SIGNER_POLL_WAIT', 10),
+    ],
+
+    'ocr' => [
+        'url' => env('OCR_API_URL', 'http://127.0.0.1:5000'),
+        // Reject enrollment selfies that do not match the KTP photo
+        'face_match_required' => env('FACE_MATCH_REQUIRED', false),
+    ],
+
+    'face' => [
+        'url' => env('FACE_API_URL', 'http://127.0.0.1:5002'),
+        'timeout' => env('FACE_API_TIMEOUT', 30),
+        // verdict, json (metrics in responses) or debug (also annotated images in the session directory)
+        'output_mode' => env('FACE_OUTPUT_MODE', 'verdict'),
+    ],
+
 ];
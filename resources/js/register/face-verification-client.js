@@ -1,6 +1,8 @@
 window.FaceVerificationClient = class FaceVerificationClient {
-    constructor(apiBaseUrl) {
+    constructor(apiBaseUrl, ktpFaceToken) {
       this.apiBaseUrl = apiBaseUrl || '/api/face-verification';
+      // Encrypted KTP portrait id from registration, lets the server match the selfie against it
+      this.ktpFaceToken = ktpFaceToken || null;
       this.sessionId = null;
       this.currentChallenge = null;
       this.stream = null;
@@ -32,7 +34,9 @@ window.FaceVerificationClient = class FaceVerificationClient {
       try {
         // Start a session
         const sessionResponse = await this.apiRequest('/start', {
-          method: 'POST'
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ ktp_face_token: this.ktpFaceToken })
         });
   
         if (!sessionResponse.success) {
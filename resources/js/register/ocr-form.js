@@ -90,12 +90,14 @@ document.addEventListener("DOMContentLoaded", function () {
                         return;
                     }
 
+                    // Keeps the KTP portrait id in the registration session for the selfie match
                     await fetch("/update-registration-file", {
                         method: "POST",
                         headers: {
                             "Content-Type": "application/json",
                             "X-CSRF-TOKEN": document.querySelector('meta[name="csrf-token"]').getAttribute("content")
                         },
+                        body: JSON.stringify({ ktp_face_token: result.ktp_face_token }),
                     });
 
                     function reverseDateFormat(dateStr) {
@@ -25,7 +25,7 @@
         const startButton = document.getElementById("startBtn");
         const captureButton = document.getElementById("captureBtn");
         
-        const faceClient = new FaceVerificationClient("{{ url('/api/face-verification') }}");
+        const faceClient = new FaceVerificationClient("{{ url('/api/face-verification') }}", @json($ktpFaceToken ?? null));
         
         faceClient.setElements(videoElement, canvasElement);
         
@@ -0,0 +1,63 @@
+<?php
+
+namespace Tests\Feature;
+
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Http\Client\Request;
+use Illuminate\Http\UploadedFile;
+use Illuminate\Support\Facades\Http;
+use Tests\TestCase;
+
+class KtpFaceMatchTest extends TestCase
+{
+    use RefreshDatabase;
+
+    private const KTP_FACE_ID = 'portrait-issued-by-the-ocr-service';
+
+    /**
+     * The selfie is matched against the KTP portrait read during registration,
+     * even though the API routes run without a session and the user corrected
+     * the NIK the OCR service read.
+     */
+    public function test_selfie_is_matched_against_the_ktp_read_at_registration(): void
+    {
+        Http::fake([
+            '*/extract-ktp' => Http::response([
+                'success' => true,
+                'data' => ['NIK' => '3171234567890128', 'Nama' => 'BUDI SANTOSO', 'Tanggal Lahir' => '17-08-1990'],
+                'confidence' => [],
+                'portrait_found' => true,
+                'ktp_face_id' => self::KTP_FACE_ID,
+            ]),
+            '*/detect-face' => Http::response(['success' => true, 'face_count' => 1]),
+            '*/match-face' => Http::response(['success' => true, 'similarity' => 0.8, 'threshold' => 0.363]),
+        ]);
+
+        $token = $this->post('/api/extract-nik', [
+            'id_card_image' => UploadedFile::fake()->image('ktp.jpg', 856, 540),
+        ])->assertOk()->assertJson(['success' => true])->json('ktp_face_token');
+        $this->assertNotEmpty($token);
+
+        $this->postJson('/update-registration-file', ['ktp_face_token' => $token])->assertOk();
+
+        // The last digit was misread, so the user corrects it on the form
+        $this->postJson('/update-registration-form', [
+            'nik' => '3171234567890123',
+            'name' => 'BUDI SANTOSO',
+            'dob' => '1990-08-17',
+        ])->assertOk();
+
+        $sessionId = $this->postJson('/api/face-verification/start', [
+            'ktp_face_token' => session('registration_data.ktp_face_token'),
+        ])->assertOk()->json('session_id');
+
+        $this->post('/api/face-verification/detect', [
+            'session_id' => $sessionId,
+            'image' => UploadedFile::fake()->image('selfie.jpg', 640, 480),
+        ])->assertOk()->assertJson(['success' => true]);
+
+        Http::assertSent(function (Request $request) {
+            return str_ends_with($request->url(), '/match-face') && $request['ktp_face_id'] === self::KTP_FACE_ID;
+        });
+    }
+}